@@ -4,7 +4,8 @@ from typing import Literal
 from tavily import TavilyClient
 
 
-from deepagents import create_deep_agent, SubAgent
+from deepagents import create_deep_agent, SubAgent, configure_tool_outputs
+from deepagents.persist import aflush_disk_writes
 
 # Ensure environment variables from .env are loaded regardless of CWD
 try:
@@ -383,6 +384,10 @@ Use this to search within specific domains or websites for targeted information.
 - Always include raw content to get detailed information for analysis
 """
 
+# Raw page content can be hundreds of KB: keep large search results in files
+# the agent reads from, rather than in its messages
+configure_tool_outputs(max_chars=20_000)
+
 # Create the agent with enhanced tools
 agent = create_deep_agent(
     [internet_search, search_specific_sources],
@@ -457,11 +462,25 @@ async def main(research_question: str = None):
         print("Initializing research agent...")
     
     # Stream the agent's execution step by step
-    async for chunk in agent.astream(
+    async for mode, chunk in agent.astream(
         {"messages": [{"role": "user", "content": question}]}, 
-        {"recursion_limit": 1000}
+        {"recursion_limit": 1000},
+        stream_mode=["updates", "custom"],
     ):
         
+        # Progress forwarded from running sub-agents
+        if mode == "custom":
+            if chunk.get("event") in ("start", "end", "model"):
+                agent_name = chunk["namespace"].split(":", 1)[0]
+                detail = chunk["event"]
+                if chunk["event"] == "model" and chunk.get("tool_calls"):
+                    detail = "using " + ", ".join(call["name"] for call in chunk["tool_calls"])
+                if RICH_AVAILABLE:
+                    progress_ctx.update(task, description=f"{agent_name}: {detail}")
+                else:
+                    print(f"🤖 {agent_name}: {detail}")
+            continue
+
         # Update progress based on the current step
         for node_name, node_output in chunk.items():
             if node_name == "agent":
@@ -527,6 +546,9 @@ async def main(research_question: str = None):
                             except Exception:
                                 pass
     
+    # Make sure files mirrored by the file tools have reached the disk
+    await aflush_disk_writes()
+
     # Best-effort: persist question for convenience; final report is written by the tool only
     try:
         from pathlib import Path
@@ -1,5 +1,6 @@
 import os
 import sys
+import uuid
 from pathlib import Path
 from typing import Any, Dict
 
@@ -32,6 +33,10 @@ except Exception:
     pass
 
 
+from deepagents.persist import aflush_disk_writes  # noqa: E402
+from deepagents.vfs import materialize_files  # noqa: E402
+
+
 app = FastAPI(title="DeepAgents Server", version="0.1.0")
 
 # Allow local dev by default
@@ -108,8 +113,15 @@ async def run_agent(req: RunRequest) -> Dict[str, Any]:
         print(f"DEBUG: Invoking research agent with prompt: {req.prompt[:50]}...")
         result = await research_agent.ainvoke(
             {"messages": [{"role": "user", "content": req.prompt}]},
-            {"recursion_limit": req.recursion_limit or 1000},
+            {
+                "recursion_limit": req.recursion_limit or 1000,
+                # Each request is its own thread: per-thread caches (e.g. grep's
+                # index) are then not shared between concurrent requests
+                "configurable": {"thread_id": str(uuid.uuid4())},
+            },
         )
+        # Durability barrier: files mirrored to disk during the run are written
+        await aflush_disk_writes()
         print(f"DEBUG: Agent result type: {type(result)}")
         print(f"DEBUG: Agent result keys: {list(result.keys()) if isinstance(result, dict) else 'Not a dict'}")
         print(f"DEBUG: Files in result: {result.get('files', {}) if isinstance(result, dict) else 'No files'}")
@@ -126,7 +138,7 @@ async def run_agent(req: RunRequest) -> Dict[str, Any]:
         print(f"DEBUG: Agent error: {exc}")
         raise HTTPException(status_code=500, detail=f"Agent error: {exc}") from exc
 
-    files = result.get("files", {}) if isinstance(result, dict) else {}
+    files = materialize_files(result.get("files")) if isinstance(result, dict) else {}
     report_content = files.get("final_report.md")
     
     # If we have a report file, ensure it has proper reference links
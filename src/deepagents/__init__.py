@@ -1,6 +1,11 @@
 from deepagents.graph import create_deep_agent
 from deepagents.state import DeepAgentState
-from deepagents.sub_agent import SubAgent
+from deepagents.filemap import FileMap
+from deepagents.vfs import configure_vfs
+from deepagents.model import configure_model
+from deepagents.compaction import configure_compaction
+from deepagents.tool_output import configure_tool_outputs
+from deepagents.sub_agent import SubAgent, configure_subagents
 
 # Ensure .env is loaded when the package is imported, without failing if dotenv is missing
 try:
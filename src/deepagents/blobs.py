@@ -0,0 +1,139 @@
+"""Content-addressed storage for file contents.
+
+When a blob store is configured (see ``deepagents.vfs.configure_vfs``), the
+``files`` channel holds small ``BlobRef`` values instead of raw strings. Identical
+contents are stored once, so checkpoints, sub-agent handoffs and unchanged files
+only carry the reference.
+"""
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import NamedTuple, Optional, Union
+
+
+class BlobRef(NamedTuple):
+    """Reference to a file's contents in the configured blob store."""
+
+    digest: str
+    size: int
+
+
+def _encode(content: str) -> bytes:
+    return content.encode("utf-8", errors="surrogatepass")
+
+
+def _decode(data: bytes) -> str:
+    return data.decode("utf-8", errors="surrogatepass")
+
+
+class BlobStore(ABC):
+    """Base class for blob stores. Blobs are keyed by the SHA-256 of their bytes."""
+
+    @abstractmethod
+    def _read(self, digest: str) -> Optional[bytes]:
+        """Return the stored bytes for ``digest``, or ``None`` if absent."""
+
+    @abstractmethod
+    def _write(self, digest: str, data: bytes) -> None:
+        """Store ``data`` under ``digest``. Called only for new digests."""
+
+    def __contains__(self, digest: str) -> bool:
+        return self._read(digest) is not None
+
+    def put(self, content: str) -> BlobRef:
+        """Store ``content`` (if not already present) and return its reference."""
+        data = _encode(content)
+        digest = hashlib.sha256(data).hexdigest()
+        if digest not in self:
+            self._write(digest, data)
+        return BlobRef(digest, len(content))
+
+    def get(self, ref: Union[BlobRef, str]) -> str:
+        """Return the content for ``ref``. Raises ``KeyError`` if it is unknown."""
+        digest = ref.digest if isinstance(ref, BlobRef) else ref
+        data = self._read(digest)
+        if data is None:
+            raise KeyError(digest)
+        return _decode(data)
+
+
+class InMemoryBlobStore(BlobStore):
+    """Blob store backed by a dict. Shared by every thread in the process."""
+
+    def __init__(self):
+        self._blobs: dict[str, bytes] = {}
+
+    def _read(self, digest: str) -> Optional[bytes]:
+        return self._blobs.get(digest)
+
+    def _write(self, digest: str, data: bytes) -> None:
+        self._blobs[digest] = data
+
+
+class LocalBlobStore(BlobStore):
+    """Blob store that keeps one file per blob under ``root``."""
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:]
+
+    def __contains__(self, digest: str) -> bool:
+        return self._path(digest).exists()
+
+    def _read(self, digest: str) -> Optional[bytes]:
+        try:
+            return self._path(digest).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, digest: str, data: bytes) -> None:
+        path = self._path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so readers never see a partial blob
+        fd, tmp = tempfile.mkstemp(dir=path.parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+
+class SQLiteBlobStore(BlobStore):
+    """Blob store backed by a single SQLite database file."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, data BLOB NOT NULL)"
+            )
+
+    def _read(self, digest: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM blobs WHERE digest = ?", (digest,)
+            ).fetchone()
+        return None if row is None else bytes(row[0])
+
+    def _write(self, digest: str, data: bytes) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO blobs (digest, data) VALUES (?, ?)",
+                (digest, data),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
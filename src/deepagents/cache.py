@@ -0,0 +1,198 @@
+"""Key-value caches with TTL and LRU eviction.
+
+Used to memoize expensive results such as sub agent runs. Keys are strings
+(usually a hash of the request); values are any picklable object. Both backends
+count hits and misses, see ``ResultCache.stats``.
+
+``WrapperCache`` reuses the wrapper made for an object (a model or a tool)
+while that wrapper is in use.
+"""
+
+import pickle
+import sqlite3
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Generic, Optional, TypeVar, Union
+
+W = TypeVar("W")
+
+
+class WrapperCache(Generic[W]):
+    """Wrapper made for each object, reused for as long as the wrapper is in use.
+
+    Wrappers are held weakly: each one keeps the object it wraps alive, so an
+    entry lives as long as something (e.g. a compiled graph) uses the wrapper.
+    """
+
+    def __init__(self):
+        self._wrappers: "weakref.WeakValueDictionary[int, W]" = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, obj: Any, make: Callable[[], W], reusable: Callable[[W], bool]) -> W:
+        """Return the wrapper of ``obj``, calling ``make`` for a new one.
+
+        ``reusable`` tells whether an existing wrapper still fits; it must check
+        that the wrapper wraps ``obj`` itself, since ids are reused.
+        """
+        with self._lock:
+            wrapper = self._wrappers.get(id(obj))
+            if wrapper is None or not reusable(wrapper):
+                wrapper = self._wrappers[id(obj)] = make()
+            return wrapper
+
+    def __len__(self) -> int:
+        return len(self._wrappers)
+
+
+class ResultCache(ABC):
+    """Base class for caches.
+
+    Args:
+        ttl: Seconds an entry stays valid after it is stored. ``None`` means
+            entries never expire.
+        max_entries: Number of entries kept; the least recently used ones are
+            evicted beyond it.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._stats_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @abstractmethod
+    def _load(self, key: str) -> Optional[tuple[Optional[float], Any]]:
+        """Return ``(expires_at, value)`` for ``key`` and mark it used, or ``None``."""
+
+    @abstractmethod
+    def _store(self, key: str, value: Any, expires_at: Optional[float]) -> None:
+        """Store ``value`` under ``key`` and evict entries beyond ``max_entries``."""
+
+    @abstractmethod
+    def _delete(self, key: str) -> None:
+        """Remove ``key`` if present."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove every entry."""
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the value for ``key``, or ``default`` if missing or expired."""
+        entry = self._load(key)
+        if entry is not None and entry[0] is not None and entry[0] <= time.time():
+            self._delete(key)
+            entry = None
+        with self._stats_lock:
+            if entry is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return default if entry is None else entry[1]
+
+    def put(self, key: str, value: Any) -> None:
+        expires_at = None if self.ttl is None else time.time() + self.ttl
+        self._store(key, value, expires_at)
+
+    def stats(self) -> dict[str, int]:
+        """Return the number of ``hits`` and ``misses`` of ``get`` so far."""
+        with self._stats_lock:
+            return {"hits": self._hits, "misses": self._misses}
+
+
+class InMemoryCache(ResultCache):
+    """Cache kept in a dict in this process."""
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = 1024):
+        super().__init__(ttl, max_entries)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple[Optional[float], Any]]" = OrderedDict()
+
+    def _load(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key: str, value: Any, expires_at: Optional[float]) -> None:
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache(ResultCache):
+    """Cache stored in a SQLite database file, so it survives restarts.
+
+    Values are pickled; only point it at a database you trust.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        ttl: Optional[float] = None,
+        max_entries: int = 1024,
+    ):
+        super().__init__(ttl, max_entries)
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL, used_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS cache_used_at ON cache (used_at)"
+            )
+
+    def _load(self, key: str):
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE cache SET used_at = ? WHERE key = ?", (time.time(), key)
+            )
+        return row[1], pickle.loads(row[0])
+
+    def _store(self, key: str, value: Any, expires_at: Optional[float]) -> None:
+        data = pickle.dumps(value)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, data, expires_at, time.time()),
+            )
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM cache ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def _delete(self, key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,64 @@
+"""Append-friendly text representation for files that grow in chunks.
+
+``append_file`` stores its result as a ``ChunkedText``: an immutable chain of
+chunks where appending links one new chunk to the existing chain, without
+copying or rescanning the content written so far. The flat string is only built
+when the file is read, edited or persisted.
+"""
+
+from typing import Optional
+
+from deepagents.serde import AsText
+
+
+class ChunkedText(AsText):
+    """Immutable text made of the chunks appended to it, newest last."""
+
+    __slots__ = ("prev", "chunk", "length", "__weakref__")
+
+    def __init__(self, text: str = ""):
+        self.prev: Optional[ChunkedText] = None
+        self.chunk = text
+        self.length = len(text)
+
+    def append(self, text: str) -> "ChunkedText":
+        """Return a new text with ``text`` added at the end."""
+        new = ChunkedText.__new__(ChunkedText)
+        new.prev = self
+        new.chunk = text
+        new.length = self.length + len(text)
+        return new
+
+    def __len__(self) -> int:
+        return self.length
+
+    def _chunks(self) -> list[str]:
+        chunks = []
+        node = self
+        while node is not None:
+            chunks.append(node.chunk)
+            node = node.prev
+        chunks.reverse()
+        return chunks
+
+    def __str__(self) -> str:
+        return "".join(self._chunks())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, ChunkedText):
+            return self.length == other.length and str(self) == str(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"ChunkedText(length={self.length}, chunks={len(self._chunks())})"
+
+    def tail(self, n: int) -> str:
+        """Return the last ``n`` characters, only visiting the chunks that hold them."""
+        parts = []
+        node = self
+        while node is not None and n > 0:
+            parts.append(node.chunk[-n:])
+            n -= len(parts[-1])
+            node = node.prev
+        parts.reverse()
+        return "".join(parts)
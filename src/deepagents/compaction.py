@@ -0,0 +1,187 @@
+"""Automatic compaction of long message histories.
+
+With ``configure_compaction(max_tokens=...)``, deep agents (and their sub
+agents) get a step before each model call that checks the size of the message
+history. Past ``max_tokens``, the oldest tool results are compacted until the
+history is back under ``target_tokens``: their content is replaced, in place,
+by a short preview (``strategy="evict"``) or a summary written by the agent's
+model (``strategy="summarize"``), and the full output is saved to a file the
+agent can ``read_file`` if it needs it again.
+
+The system prompt is not part of the history and is never touched; neither are
+``write_todos`` results (the model only sees the todo list through them), tool
+results already moved to a file by ``deepagents.tool_output``, nor the
+``keep_recent`` latest messages.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Literal, Optional
+
+from langchain_core.messages import BaseMessage, HumanMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.runnables import RunnableLambda
+
+from deepagents.settings import update_settings
+from deepagents.tool_output import is_spilled, output_path
+from deepagents.vfs import encode_content
+
+
+@dataclass
+class CompactionSettings:
+    """Process-wide settings for message history compaction.
+
+    Attributes:
+        max_tokens: Compact the history once it is estimated to exceed this many
+            tokens. ``None`` (the default) disables compaction.
+        target_tokens: Size to compact the history down to; half of
+            ``max_tokens`` by default, so compaction does not run on every turn.
+        keep_recent: Number of latest messages never compacted.
+        strategy: ``"evict"`` keeps a preview of each compacted tool result,
+            ``"summarize"`` asks the agent's model for a summary of it.
+        preview_chars: Length of the preview kept by ``"evict"``.
+        output_dir: Directory of the files the full tool results are saved to.
+    """
+
+    max_tokens: Optional[int] = None
+    target_tokens: Optional[int] = None
+    keep_recent: int = 10
+    strategy: Literal["evict", "summarize"] = "evict"
+    preview_chars: int = 500
+    output_dir: str = "tool_outputs"
+
+
+settings = CompactionSettings()
+
+
+def configure_compaction(**changes: Any) -> CompactionSettings:
+    """Update the process-wide ``CompactionSettings`` and return them.
+
+    Agents created while ``max_tokens`` is ``None`` have no compaction step.
+
+    Example:
+        configure_compaction(max_tokens=60_000, keep_recent=20)
+    """
+    return update_settings(settings, "compaction", changes)
+
+
+# Tools whose results are always kept
+_PINNED_TOOLS = ("write_todos",)
+
+_MARKER = "[Compacted to save context."
+
+SUMMARY_PROMPT = """Summarize the following output of the `{name}` tool in at most {chars} characters. Keep every fact, number, name, URL and file path that could matter later; leave out boilerplate.
+
+{content}"""
+
+
+def _compactable(message: BaseMessage) -> bool:
+    return (
+        isinstance(message, ToolMessage)
+        and message.name not in _PINNED_TOOLS
+        and isinstance(message.content, str)
+        and len(message.content) > settings.preview_chars
+        and not message.content.startswith(_MARKER)
+        # Its full output is already in a file, and the message is short
+        and not is_spilled(message)
+    )
+
+
+def _compacted(message: ToolMessage, path: str, body: str) -> ToolMessage:
+    # Same id, so the ``messages`` reducer replaces the original
+    return message.model_copy(
+        update={
+            "content": f"{_MARKER} The full output ({len(message.content)} characters) "
+            f"is in the file {path}; use read_file to see more.]\n\n{body}"
+        }
+    )
+
+
+def _select(messages: list[BaseMessage]) -> list[ToolMessage]:
+    """Return the oldest tool results whose compaction brings the history under target."""
+    target = settings.target_tokens or settings.max_tokens // 2
+    excess = count_tokens_approximately(messages) - target
+    selected = []
+    for message in messages[: max(len(messages) - settings.keep_recent, 0)]:
+        if excess <= 0:
+            break
+        if _compactable(message):
+            selected.append(message)
+            excess -= count_tokens_approximately([message]) - settings.preview_chars // 4
+    return selected
+
+
+def _update(selected: list[ToolMessage], bodies: list[str]) -> dict:
+    messages = []
+    files = {}
+    for message, body in zip(selected, bodies):
+        path = output_path(settings.output_dir, message.name, message.tool_call_id)
+        files[path] = encode_content(message.content)
+        messages.append(_compacted(message, path, body))
+    return {"messages": messages, "files": files}
+
+
+def _over(state) -> Optional[list[BaseMessage]]:
+    messages = state["messages"]
+    if settings.max_tokens is None or count_tokens_approximately(messages) <= settings.max_tokens:
+        return None
+    return messages
+
+
+def _summary_requests(selected: list[ToolMessage]) -> list[list[BaseMessage]]:
+    return [
+        [
+            HumanMessage(
+                SUMMARY_PROMPT.format(
+                    name=message.name, chars=settings.preview_chars, content=message.content
+                )
+            )
+        ]
+        for message in selected
+    ]
+
+
+def _summaries(responses) -> list[str]:
+    return [
+        response.content if isinstance(response.content, str) else str(response.text)
+        for response in responses
+    ]
+
+
+# Summaries are internal: keep their tokens out of the ``messages`` stream mode
+_SUMMARY_CONFIG = {"tags": ["nostream"], "run_name": "summarize_tool_output"}
+
+
+def compaction_hook(model):
+    """Return the ``pre_model_hook`` compacting the history of an agent using ``model``.
+
+    It has a sync and an async version, so summaries run concurrently with
+    ``ainvoke``/``astream``.
+    """
+    if isinstance(model, str):
+        from langchain.chat_models import init_chat_model
+
+        model = init_chat_model(model)
+
+    def compact(state) -> dict:
+        messages = _over(state)
+        selected = _select(messages) if messages else []
+        if not selected:
+            return {}
+        if settings.strategy == "summarize":
+            bodies = _summaries(model.batch(_summary_requests(selected), _SUMMARY_CONFIG))
+        else:
+            bodies = [message.content[: settings.preview_chars] for message in selected]
+        return _update(selected, bodies)
+
+    async def acompact(state) -> dict:
+        messages = _over(state)
+        selected = _select(messages) if messages else []
+        if not selected:
+            return {}
+        if settings.strategy == "summarize":
+            bodies = _summaries(await model.abatch(_summary_requests(selected), _SUMMARY_CONFIG))
+        else:
+            bodies = [message.content[: settings.preview_chars] for message in selected]
+        return _update(selected, bodies)
+
+    return RunnableLambda(compact, afunc=acompact, name="compact_messages")
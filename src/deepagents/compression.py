@@ -0,0 +1,59 @@
+"""Transparent compression of large file contents kept in agent state.
+
+With ``configure_vfs(compress_min_size=...)``, contents at least that large are
+stored as ``CompressedText`` (zlib or lzma from the standard library) and only
+decompressed when a tool reads or edits them.
+"""
+
+import lzma
+import threading
+import zlib
+from typing import NamedTuple
+
+_CODECS = {
+    "zlib": (zlib.compress, zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+
+class CompressedText(NamedTuple):
+    """File content stored compressed in ``state["files"]``."""
+
+    codec: str
+    data: bytes
+    size: int
+
+
+_lock = threading.Lock()
+_stats = {"compressed": 0, "bytes_in": 0, "bytes_out": 0}
+
+
+def compress_text(text: str, codec: str = "zlib"):
+    """Return ``text`` as ``CompressedText``, or ``text`` itself if that is not smaller."""
+    compress, _ = _CODECS[codec]
+    raw = text.encode("utf-8", errors="surrogatepass")
+    data = compress(raw)
+    if len(data) >= len(raw):
+        return text
+    with _lock:
+        _stats["compressed"] += 1
+        _stats["bytes_in"] += len(raw)
+        _stats["bytes_out"] += len(data)
+    return CompressedText(codec, data, len(text))
+
+
+def decompress_text(value: CompressedText) -> str:
+    _, decompress = _CODECS[value.codec]
+    return decompress(value.data).decode("utf-8", errors="surrogatepass")
+
+
+def compression_stats() -> dict[str, int]:
+    """Return counters for every compression done in this process.
+
+    ``bytes_saved`` is the UTF-8 size of the compressed contents minus the size
+    actually kept in state.
+    """
+    with _lock:
+        stats = dict(_stats)
+    stats["bytes_saved"] = stats["bytes_in"] - stats["bytes_out"]
+    return stats
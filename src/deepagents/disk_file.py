@@ -0,0 +1,148 @@
+"""Windowed reads of files on the local disk.
+
+``read_file`` falls back to the disk for paths that are not in the virtual file
+system. Instead of decoding the whole file, ``DiskFile`` indexes line starts
+lazily, reading the file in blocks only as far as the requested window, and
+then reads just the bytes of the lines asked for. Reading 2000 lines of a
+multi-GB log only touches the blocks holding those lines. Indexed files are
+cached and reused for as long as the file's ``stat`` is unchanged.
+
+Files are read with plain ``read`` calls rather than memory-mapped: a file
+truncated while mapped (e.g. rewritten in place by another process) would
+crash the process with ``SIGBUS`` on the next access.
+"""
+
+import codecs
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Union
+
+# Same boundaries as ``str.splitlines``, encoded as UTF-8
+_LINE_BREAK = re.compile(rb"\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e]|\xc2\x85|\xe2\x80[\xa8\xa9]")
+# Longest line terminator, in bytes
+_MAX_BREAK = 3
+_BLOCK_SIZE = 1 << 20
+_MAX_CACHED = 16
+
+
+class DiskFile:
+    """File on disk with an incrementally built line index."""
+
+    def __init__(self, path: Path, stat: os.stat_result):
+        self.path = path
+        self.stat_key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        self._lock = threading.Lock()
+        # starts[i] is the byte offset of line i; ends[i] where its terminator begins
+        self._starts = array("Q")
+        self._ends = array("Q")
+        self._scanned = 0
+        self._complete = stat.st_size == 0
+        self._blank = True if self._complete else None
+
+    @property
+    def blank(self) -> bool:
+        """Whether the file is empty or only holds whitespace."""
+        with self._lock:
+            if self._blank is None:
+                self._blank = self._is_blank()
+            return self._blank
+
+    def _is_blank(self) -> bool:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        with open(self.path, "rb") as f:
+            while block := f.read(_BLOCK_SIZE):
+                text = decoder.decode(block)
+                if text and not text.isspace():
+                    return False
+        return True
+
+    def _index_until(self, line_count: int) -> None:
+        """Extend the index until it covers ``line_count`` lines or the whole file."""
+        if self._complete or len(self._starts) >= line_count:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._scanned)
+            # ``buf`` holds the file from offset ``buf_start``; ``line_start`` is
+            # where the line being scanned begins
+            buf = b""
+            buf_start = line_start = self._scanned
+            while True:
+                block = f.read(_BLOCK_SIZE)
+                buf += block
+                # A terminator starting in the last bytes may continue in the next block
+                limit = len(buf) if not block else len(buf) - _MAX_BREAK
+                pos = 0
+                for match in _LINE_BREAK.finditer(buf):
+                    if match.start() >= limit:
+                        break
+                    self._starts.append(line_start)
+                    self._ends.append(buf_start + match.start())
+                    pos = match.end()
+                    line_start = self._scanned = buf_start + pos
+                    if len(self._starts) >= line_count:
+                        return
+                if not block:
+                    break
+                cut = max(pos, limit)
+                buf = buf[cut:]
+                buf_start += cut
+        end = buf_start + len(buf)
+        if line_start < end:
+            # Last line without a trailing newline
+            self._starts.append(line_start)
+            self._ends.append(end)
+            self._scanned = end
+        self._complete = True
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._index_until(float("inf"))
+            return len(self._starts)
+
+    def lines(self, start: int, stop: int) -> list[str]:
+        """Return decoded lines ``start`` to ``stop`` (exclusive)."""
+        with self._lock:
+            self._index_until(stop)
+            stop = min(stop, len(self._starts))
+            if start >= stop:
+                return []
+            first = self._starts[start]
+            with open(self.path, "rb") as f:
+                f.seek(first)
+                data = f.read(self._ends[stop - 1] - first)
+            return [
+                data[self._starts[i] - first : self._ends[i] - first].decode(
+                    "utf-8", errors="ignore"
+                )
+                for i in range(start, stop)
+            ]
+
+
+_cache: "OrderedDict[Path, DiskFile]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def open_disk_file(path: Union[str, Path]) -> DiskFile:
+    """Return a cached ``DiskFile`` for ``path``, re-indexing it if it changed on disk.
+
+    Raises ``OSError`` if the file cannot be read.
+    """
+    path = Path(path).resolve()
+    stat = path.stat()
+    key = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    with _cache_lock:
+        disk_file = _cache.get(path)
+        if disk_file is not None and disk_file.stat_key == key:
+            _cache.move_to_end(path)
+            return disk_file
+    disk_file = DiskFile(path, stat)
+    with _cache_lock:
+        _cache[path] = disk_file
+        _cache.move_to_end(path)
+        while len(_cache) > _MAX_CACHED:
+            _cache.popitem(last=False)
+    return disk_file
@@ -0,0 +1,447 @@
+"""Persistent mapping used for the ``files`` channel of ``DeepAgentState``.
+
+``FileMap`` is an immutable hash array mapped trie (HAMT). ``set`` and
+``delete`` return a new map that shares every untouched branch with the
+original, so writing one file only copies the nodes on that file's path
+instead of the whole mapping. Merging two maps that derive from a common
+ancestor skips shared branches entirely.
+"""
+
+import threading
+import uuid
+from collections.abc import Mapping
+from typing import Any, Iterable, Iterator, Optional, Union
+
+_SHIFT = 5
+_MASK = 0x1F
+_MISSING = object()
+
+
+def _hash(key) -> int:
+    return hash(key) & 0xFFFFFFFFFFFFFFFF
+
+
+def _bit(h: int, shift: int) -> int:
+    return 1 << ((h >> shift) & _MASK)
+
+
+def _index(bitmap: int, bit: int) -> int:
+    return (bitmap & (bit - 1)).bit_count()
+
+
+# Leaves are stored as ``(hash, key, value)`` tuples; anything else in a node's
+# ``entries`` is a child node.
+
+
+class _BitmapNode:
+    __slots__ = ("bitmap", "entries", "size")
+
+    def __init__(self, bitmap: int, entries: tuple, size: int):
+        self.bitmap = bitmap
+        self.entries = entries
+        self.size = size
+
+
+class _CollisionNode:
+    __slots__ = ("hash", "entries", "size")
+
+    def __init__(self, h: int, entries: tuple):
+        self.hash = h
+        self.entries = entries
+        self.size = len(entries)
+
+
+_EMPTY = _BitmapNode(0, (), 0)
+
+
+def _entry_size(entry) -> int:
+    return 1 if isinstance(entry, tuple) else entry.size
+
+
+def _leaves(entry) -> Iterator[tuple]:
+    if isinstance(entry, tuple):
+        yield entry
+    elif isinstance(entry, _CollisionNode):
+        yield from entry.entries
+    else:
+        for child in entry.entries:
+            yield from _leaves(child)
+
+
+def _find(node, shift: int, h: int, key, default):
+    while True:
+        if isinstance(node, _CollisionNode):
+            if node.hash == h:
+                for _, k, v in node.entries:
+                    if k == key:
+                        return v
+            return default
+        bit = _bit(h, shift)
+        if not node.bitmap & bit:
+            return default
+        entry = node.entries[_index(node.bitmap, bit)]
+        if isinstance(entry, tuple):
+            if entry[0] == h and entry[1] == key:
+                return entry[2]
+            return default
+        node = entry
+        shift += _SHIFT
+
+
+def _pair(shift: int, a: tuple, b: tuple):
+    """Build the smallest node holding two leaves with different keys."""
+    if a[0] == b[0]:
+        return _CollisionNode(a[0], (a, b))
+    bit_a, bit_b = _bit(a[0], shift), _bit(b[0], shift)
+    if bit_a == bit_b:
+        return _BitmapNode(bit_a, (_pair(shift + _SHIFT, a, b),), 2)
+    entries = (a, b) if bit_a < bit_b else (b, a)
+    return _BitmapNode(bit_a | bit_b, entries, 2)
+
+
+def _replace(entries: tuple, idx: int, entry) -> tuple:
+    return entries[:idx] + (entry,) + entries[idx + 1 :]
+
+
+def _assoc(node, shift: int, leaf: tuple):
+    """Return ``node`` with ``leaf`` inserted; ``node`` itself if nothing changed."""
+    h, key, value = leaf
+    if isinstance(node, _CollisionNode):
+        if node.hash != h:
+            wrapper = _BitmapNode(_bit(node.hash, shift), (node,), node.size)
+            return _assoc(wrapper, shift, leaf)
+        for i, (_, k, v) in enumerate(node.entries):
+            if k == key:
+                if v is value:
+                    return node
+                return _CollisionNode(h, _replace(node.entries, i, leaf))
+        return _CollisionNode(h, node.entries + (leaf,))
+
+    bit = _bit(h, shift)
+    idx = _index(node.bitmap, bit)
+    if not node.bitmap & bit:
+        entries = node.entries[:idx] + (leaf,) + node.entries[idx:]
+        return _BitmapNode(node.bitmap | bit, entries, node.size + 1)
+    entry = node.entries[idx]
+    if isinstance(entry, tuple):
+        if entry[0] == h and entry[1] == key:
+            if entry[2] is value:
+                return node
+            return _BitmapNode(node.bitmap, _replace(node.entries, idx, leaf), node.size)
+        child = _pair(shift + _SHIFT, entry, leaf)
+    else:
+        child = _assoc(entry, shift + _SHIFT, leaf)
+        if child is entry:
+            return node
+    size = node.size - _entry_size(entry) + child.size
+    return _BitmapNode(node.bitmap, _replace(node.entries, idx, child), size)
+
+
+def _collapse(node):
+    """Return the single leaf of a one-entry node so parents can inline it."""
+    if node.size == 1:
+        entry = node.entries[0]
+        if isinstance(entry, tuple):
+            return entry
+    return node
+
+
+def _without(node, shift: int, h: int, key):
+    """Return ``node`` without ``key``: ``None`` if empty, ``node`` if absent."""
+    if isinstance(node, _CollisionNode):
+        if node.hash != h:
+            return node
+        remaining = tuple(e for e in node.entries if e[1] != key)
+        if len(remaining) == len(node.entries):
+            return node
+        if not remaining:
+            return None
+        return _CollisionNode(h, remaining)
+
+    bit = _bit(h, shift)
+    if not node.bitmap & bit:
+        return node
+    idx = _index(node.bitmap, bit)
+    entry = node.entries[idx]
+    if isinstance(entry, tuple):
+        if entry[0] != h or entry[1] != key:
+            return node
+        child = None
+    else:
+        child = _without(entry, shift + _SHIFT, h, key)
+        if child is entry:
+            return node
+    if child is None:
+        if node.bitmap == bit:
+            return None
+        entries = node.entries[:idx] + node.entries[idx + 1 :]
+        return _BitmapNode(node.bitmap ^ bit, entries, node.size - 1)
+    child = _collapse(child)
+    return _BitmapNode(node.bitmap, _replace(node.entries, idx, child), node.size - 1)
+
+
+def _as_node(entry, shift: int):
+    if isinstance(entry, tuple):
+        return _BitmapNode(_bit(entry[0], shift), (entry,), 1)
+    return entry
+
+
+def _merge(a, b, shift: int):
+    """Union of two entries at ``shift``; values from ``b`` win on conflict."""
+    if a is b:
+        return a
+    if isinstance(a, tuple) and isinstance(b, tuple):
+        if a[0] == b[0] and a[1] == b[1]:
+            return a if a[2] is b[2] else b
+        return _pair(shift, a, b)
+    if isinstance(b, tuple):
+        return _assoc(a, shift, b)
+    if isinstance(a, tuple):
+        if _find(b, shift, a[0], a[1], _MISSING) is _MISSING:
+            return _assoc(b, shift, a)
+        return b
+    if not (isinstance(a, _BitmapNode) and isinstance(b, _BitmapNode)):
+        node = a
+        for leaf in _leaves(b):
+            node = _assoc(node, shift, leaf)
+        return node
+
+    entries = []
+    size = 0
+    shared = True
+    bits = a.bitmap | b.bitmap
+    while bits:
+        bit = bits & -bits
+        bits ^= bit
+        ea = a.entries[_index(a.bitmap, bit)] if a.bitmap & bit else None
+        eb = b.entries[_index(b.bitmap, bit)] if b.bitmap & bit else None
+        if eb is None:
+            entry = ea
+        elif ea is None:
+            entry = eb
+            shared = False
+        else:
+            entry = _merge(ea, eb, shift + _SHIFT)
+            shared = shared and entry is ea
+        entries.append(entry)
+        size += _entry_size(entry)
+    if shared:
+        return a
+    return _BitmapNode(a.bitmap | b.bitmap, tuple(entries), size)
+
+
+def _diff(a, b, shift: int, out: list) -> None:
+    """Append ``(key, old, new)`` for every key whose value differs between entries.
+
+    Missing sides are ``None`` entries and ``_MISSING`` values. Shared branches
+    are skipped without being visited.
+    """
+    if a is b:
+        return
+    if isinstance(a, _BitmapNode) and isinstance(b, _BitmapNode):
+        bits = a.bitmap | b.bitmap
+        while bits:
+            bit = bits & -bits
+            bits ^= bit
+            ea = a.entries[_index(a.bitmap, bit)] if a.bitmap & bit else None
+            eb = b.entries[_index(b.bitmap, bit)] if b.bitmap & bit else None
+            _diff(ea, eb, shift + _SHIFT, out)
+        return
+    old = {} if a is None else {k: v for _, k, v in _leaves(a)}
+    new = {} if b is None else {k: v for _, k, v in _leaves(b)}
+    for key, value in old.items():
+        other = new.get(key, _MISSING)
+        if other is _MISSING or (other is not value and other != value):
+            out.append((key, value, other))
+    for key, value in new.items():
+        if key not in old:
+            out.append((key, _MISSING, value))
+
+
+_snapshot_lock = threading.Lock()
+
+
+class FileMap(Mapping):
+    """Immutable, structurally shared mapping of file path to file content.
+
+    Behaves like a read-only ``dict``. Use ``set``/``delete``/``update`` to derive
+    new maps; the original is never modified.
+    """
+
+    __slots__ = ("_root", "_paths", "_snapshot_id", "__weakref__")
+
+    def __init__(self, items: Optional[Union[Mapping, Iterable[tuple]]] = None):
+        root = _EMPTY
+        if items is not None:
+            pairs = items.items() if isinstance(items, Mapping) else items
+            for key, value in pairs:
+                root = _assoc(root, 0, (_hash(key), key, value))
+        self._root = root
+        self._paths = None
+        self._snapshot_id = None
+
+    @classmethod
+    def _from_root(cls, root, paths=None) -> "FileMap":
+        new = cls.__new__(cls)
+        new._root = _EMPTY if root is None else _as_node(root, 0)
+        new._paths = paths
+        new._snapshot_id = None
+        return new
+
+    def __getitem__(self, key):
+        value = _find(self._root, 0, _hash(key), key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        return _find(self._root, 0, _hash(key), key, default)
+
+    def __contains__(self, key) -> bool:
+        return _find(self._root, 0, _hash(key), key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator:
+        for _, key, _ in _leaves(self._root):
+            yield key
+
+    def __len__(self) -> int:
+        return self._root.size
+
+    def _pairs(self) -> Iterator[tuple]:
+        for _, key, value in _leaves(self._root):
+            yield key, value
+
+    def path_index(self):
+        """Return the ``PathTrie`` of this map's keys.
+
+        It is built on first use; maps derived from this one afterwards keep it
+        up to date incrementally.
+        """
+        if self._paths is None:
+            from deepagents.path_index import PathTrie
+
+            self._paths = PathTrie.build(self)
+        return self._paths
+
+    @property
+    def snapshot_id(self) -> str:
+        """Random id of this map object, created on first use.
+
+        Unlike ``id()`` it is never reused, in this process or another, so data
+        derived from one ``files`` value can be keyed on it. Copies of the map
+        (e.g. restored from a checkpoint) get their own.
+        """
+        if self._snapshot_id is None:
+            with _snapshot_lock:
+                if self._snapshot_id is None:
+                    self._snapshot_id = uuid.uuid4().hex
+        return self._snapshot_id
+
+    def set(self, key, value) -> "FileMap":
+        """Return a new map with ``key`` set to ``value``."""
+        root = _assoc(self._root, 0, (_hash(key), key, value))
+        if root is self._root:
+            return self
+        paths = self._paths
+        if paths is not None and root.size > self._root.size:
+            paths = paths.add(key)
+        return FileMap._from_root(root, paths)
+
+    def delete(self, key) -> "FileMap":
+        """Return a new map without ``key``. Missing keys are ignored."""
+        root = _without(self._root, 0, _hash(key), key)
+        if root is self._root:
+            return self
+        paths = None if self._paths is None else self._paths.remove(key)
+        return FileMap._from_root(root, paths)
+
+    def update(self, other: Union[Mapping, Iterable[tuple]]) -> "FileMap":
+        """Return a new map with the entries of ``other`` applied on top.
+
+        When ``other`` is a ``FileMap`` derived from this one, only the branches
+        that actually differ are visited.
+        """
+        paths = self._paths
+        if isinstance(other, FileMap):
+            root = _merge(self._root, other._root, 0)
+            if root is self._root:
+                return self
+            if paths is not None:
+                changes = []
+                _diff(self._root, root, 0, changes)
+                for key, old, _ in changes:
+                    if old is _MISSING:
+                        paths = paths.add(key)
+            return FileMap._from_root(root, paths)
+        root = self._root
+        pairs = other.items() if isinstance(other, Mapping) else other
+        for key, value in pairs:
+            size = root.size
+            root = _assoc(root, 0, (_hash(key), key, value))
+            if paths is not None and root.size > size:
+                paths = paths.add(key)
+        return self if root is self._root else FileMap._from_root(root, paths)
+
+    def diff(self, other: "FileMap", deleted=None) -> dict:
+        """Return the changes that turn this map into ``other``.
+
+        The result maps each added or changed key to its value in ``other`` and
+        each removed key to ``deleted``. Branches the two maps share are skipped,
+        so diffing a map against one derived from it costs the size of the change.
+        """
+        changes = []
+        _diff(self._root, other._root, 0, changes)
+        return {
+            key: deleted if new is _MISSING else new for key, _, new in changes
+        }
+
+    def __repr__(self) -> str:
+        return f"FileMap({dict(self._pairs())!r})"
+
+    def __copy__(self) -> "FileMap":
+        # Immutable: copies (e.g. of channel values) can share the map
+        return self
+
+    def __deepcopy__(self, memo) -> "FileMap":
+        return self
+
+    def __reduce__(self):
+        return (FileMap, (dict(self._pairs()),))
+
+    def _asdict(self) -> dict[str, Any]:
+        # Checkpointed as a plain dict (see ``deepagents.serde``)
+        return {"items": dict(self._pairs())}
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source, handler):
+        # Lets pydantic validate and describe state containing a ``FileMap``
+        # (e.g. ``get_input_jsonschema``): it is a mapping of path to text, and
+        # an existing map is passed through as is, keeping its shared branches.
+        from pydantic_core import core_schema
+
+        from deepagents.vfs import decode_content
+
+        def from_json(value: dict) -> "FileMap":
+            return cls(value)
+
+        def to_json(value: "FileMap") -> dict[str, str]:
+            return {key: decode_content(content) for key, content in value.items()}
+
+        return core_schema.json_or_python_schema(
+            json_schema=core_schema.no_info_after_validator_function(
+                from_json,
+                core_schema.dict_schema(core_schema.str_schema(), core_schema.str_schema()),
+            ),
+            python_schema=core_schema.union_schema(
+                [
+                    core_schema.is_instance_schema(cls),
+                    core_schema.no_info_after_validator_function(
+                        from_json,
+                        core_schema.dict_schema(core_schema.str_schema(), core_schema.any_schema()),
+                    ),
+                ]
+            ),
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                to_json, when_used="json"
+            ),
+        )
@@ -1,6 +1,18 @@
-from deepagents.sub_agent import _create_task_tool, SubAgent
+from deepagents.sub_agent import _create_task_tools, SubAgent
 from deepagents.model import get_default_model
-from deepagents.tools import write_todos, write_file, read_file, ls, edit_file
+from deepagents.llm_cache import cached_model
+from deepagents.compaction import compaction_hook, settings as compaction_settings
+from deepagents.tool_output import spill_large_outputs, settings as tool_output_settings
+from deepagents.tools import (
+    write_todos,
+    write_file,
+    append_file,
+    read_file,
+    ls,
+    edit_file,
+    multi_edit,
+    grep,
+)
 from deepagents.state import DeepAgentState
 from typing import Sequence, Union, Callable, Any, TypeVar, Type, Optional
 from langchain_core.tools import BaseTool
@@ -21,7 +33,8 @@ These tools are also EXTREMELY helpful for planning tasks, and for breaking down
 It is critical that you mark todos as completed as soon as you are done with a task. Do not batch up multiple tasks before marking them as completed.
 ## `task`
 
-- When doing web search, prefer to use the `task` tool in order to reduce context usage."""
+- When doing web search, prefer to use the `task` tool in order to reduce context usage.
+- To run several independent tasks at once, use a single `task_batch` call instead of many `task` calls."""
 
 
 def create_deep_agent(
@@ -34,7 +47,8 @@ def create_deep_agent(
     """Create a deep agent.
 
     This agent will by default have access to a tool to write todos (write_todos),
-    and then four file editing tools: write_file, ls, read_file, edit_file.
+    and then seven file tools: write_file, append_file, ls, read_file, edit_file,
+    multi_edit, grep.
 
     Args:
         tools: The additional tools the agent should have access to.
@@ -50,21 +64,36 @@ def create_deep_agent(
         state_schema: The schema of the deep agent. Should subclass from DeepAgentState
     """
     prompt = instructions + base_prompt
-    built_in_tools = [write_todos, write_file, read_file, ls, edit_file]
+    built_in_tools = [
+        write_todos,
+        write_file,
+        append_file,
+        read_file,
+        ls,
+        edit_file,
+        multi_edit,
+        grep,
+    ]
     if model is None:
         model = get_default_model()
+    model = cached_model(model)
     state_schema = state_schema or DeepAgentState
-    task_tool = _create_task_tool(
+    if tool_output_settings.max_chars is not None:
+        tools = [spill_large_outputs(t) for t in tools]
+    task_tools = _create_task_tools(
         list(tools) + built_in_tools,
         instructions,
         subagents or [],
         model,
         state_schema
     )
-    all_tools = built_in_tools + list(tools) + [task_tool]
+    all_tools = built_in_tools + list(tools) + task_tools
     return create_react_agent(
         model,
         prompt=prompt,
         tools=all_tools,
         state_schema=state_schema,
+        pre_model_hook=(
+            compaction_hook(model) if compaction_settings.max_tokens is not None else None
+        ),
     )
@@ -0,0 +1,104 @@
+"""Line-offset index so ``read_file`` can page through large files cheaply.
+
+Building the index is a single pass over the text; afterwards any
+``offset``/``limit`` window is sliced directly out of the original string.
+Indexes are cached per path and dropped whenever the file is written or edited.
+A cached index holds the file's text, so the cache is bounded by the total
+length of those texts: a file spilled out of the state (or stored compressed)
+is not kept decoded in memory beyond that.
+"""
+
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Callable
+
+from deepagents.vfs import same_value
+
+# Same boundaries as ``str.splitlines``
+_TERMINATORS = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+_LINE_BREAK = re.compile(r"\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+_MAX_CACHED = 64
+# Total characters of the texts held by cached indexes
+_MAX_CACHED_CHARS = 32 * 1024 * 1024
+
+# Longest line ``read_file`` and ``grep`` show; the rest of a longer line is cut
+MAX_LINE_CHARS = 2000
+
+
+class LineIndex:
+    """Start offset of every line in ``text``, plus ``len(text)`` as a sentinel."""
+
+    __slots__ = ("text", "starts", "blank")
+
+    def __init__(self, text: str):
+        self.text = text
+        starts = array("Q", [0])
+        starts.extend(m.end() for m in _LINE_BREAK.finditer(text))
+        if starts[-1] != len(text):
+            starts.append(len(text))
+        self.starts = starts
+        self.blank = not text or text.isspace()
+
+    def __len__(self) -> int:
+        return len(self.starts) - 1
+
+    def line(self, i: int) -> str:
+        """Return line ``i`` (0-based) without its line terminator."""
+        start, end = self.starts[i], self.starts[i + 1]
+        text = self.text
+        if end > start and text[end - 1] in _TERMINATORS:
+            end -= 1
+            if text[end] == "\n" and end > start and text[end - 1] == "\r":
+                end -= 1
+        return text[start:end]
+
+    def lines(self, start: int, stop: int) -> list[str]:
+        """Return lines ``start`` to ``stop`` (exclusive), like ``splitlines()[start:stop]``."""
+        stop = min(stop, len(self))
+        return [self.line(i) for i in range(start, stop)]
+
+
+# path -> (state value the index was built from, index)
+_cache: "OrderedDict[str, tuple[object, LineIndex]]" = OrderedDict()
+_cached_chars = 0
+_lock = threading.Lock()
+
+
+def _drop(path: str) -> None:
+    global _cached_chars
+    entry = _cache.pop(path, None)
+    if entry is not None:
+        _cached_chars -= len(entry[1].text)
+
+
+def cached_line_index(path: str, value, load: Callable[[object], str]) -> LineIndex:
+    """Return the line index for ``path`` whose stored value is ``value``.
+
+    ``load`` turns the stored value into text and is only called on a cache miss.
+    Indexes of texts longer than the whole cache are not cached.
+    """
+    global _cached_chars
+    with _lock:
+        entry = _cache.get(path)
+        if entry is not None and same_value(entry[0], value):
+            _cache.move_to_end(path)
+            return entry[1]
+    index = LineIndex(load(value))
+    if len(index.text) > _MAX_CACHED_CHARS:
+        invalidate_line_index(path)
+        return index
+    with _lock:
+        _drop(path)
+        _cache[path] = (value, index)
+        _cached_chars += len(index.text)
+        while len(_cache) > _MAX_CACHED or _cached_chars > _MAX_CACHED_CHARS:
+            _drop(next(iter(_cache)))
+    return index
+
+
+def invalidate_line_index(path: str) -> None:
+    """Forget the cached index for ``path``."""
+    with _lock:
+        _drop(path)
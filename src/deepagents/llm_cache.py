@@ -0,0 +1,276 @@
+"""Caching of model responses.
+
+With ``configure_model(response_cache=...)``, ``create_deep_agent`` wraps its
+model in a ``CachedChatModel``: a call with the same messages, tools, model and
+sampling parameters as an earlier one returns the earlier response without
+calling the model. Any ``deepagents.cache`` backend can hold the responses,
+e.g. an ``InMemoryCache`` or a ``SQLiteCache`` shared by regression runs.
+"""
+
+import hashlib
+import json
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.messages.utils import message_chunk_to_message
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from deepagents.cache import ResultCache, WrapperCache
+from deepagents.model import settings
+
+
+def _canonical_messages(messages: list[BaseMessage]) -> list:
+    """Return what identifies ``messages`` as a request.
+
+    Message ids and metadata are left out, and tool call ids (random for most
+    providers) are numbered in order of appearance.
+    """
+    call_ids: dict[str, str] = {}
+
+    def call_id(value):
+        if value is None:
+            return None
+        return call_ids.setdefault(value, f"call_{len(call_ids)}")
+
+    out = []
+    for message in messages:
+        entry = {"type": message.type, "content": message.content}
+        if getattr(message, "name", None):
+            entry["name"] = message.name
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            entry["tool_calls"] = [
+                {"name": call["name"], "args": call["args"], "id": call_id(call.get("id"))}
+                for call in tool_calls
+            ]
+        if message.type == "tool":
+            entry["tool_call_id"] = call_id(message.tool_call_id)
+        out.append(entry)
+    return out
+
+
+# Model attributes that change what a call may return; not every integration
+# reports them in its identifying parameters
+_SAMPLING_PARAMS = (
+    "temperature",
+    "top_p",
+    "top_k",
+    "seed",
+    "n",
+    "max_tokens",
+    "frequency_penalty",
+    "presence_penalty",
+)
+
+
+def _sampling(model: BaseChatModel, kwargs: dict) -> dict:
+    params = {
+        name: getattr(model, name) for name in _SAMPLING_PARAMS if hasattr(model, name)
+    }
+    params.update((name, kwargs[name]) for name in _SAMPLING_PARAMS if name in kwargs)
+    return params
+
+
+class CachedChatModel(BaseChatModel):
+    """Chat model returning cached responses of ``model`` for repeated requests.
+
+    The cache key is a hash of the messages, the model's parameters (including
+    sampling settings such as ``temperature``), the bound tools and the call
+    arguments. With ``cache_sampled=False``, calls made with a non-zero
+    temperature bypass the cache.
+    """
+
+    model: BaseChatModel
+    response_cache: ResultCache
+    cache_sampled: bool = True
+    # Arguments bound with ``bind_tools``, passed to ``model`` on every call
+    bound_kwargs: dict = {}
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    @property
+    def _llm_type(self) -> str:
+        return f"cached-{self.model._llm_type}"
+
+    @property
+    def _identifying_params(self) -> dict[str, Any]:
+        return self.model._identifying_params
+
+    def bind_tools(self, tools, **kwargs: Any) -> "CachedChatModel":
+        bound = self.model.bind_tools(tools, **kwargs)
+        return self.model_copy(
+            update={
+                "bound_kwargs": {**self.bound_kwargs, **getattr(bound, "kwargs", {})}
+            }
+        )
+
+    def _key(self, messages: list[BaseMessage], stop, kwargs: dict) -> Optional[str]:
+        sampling = _sampling(self.model, kwargs)
+        if not self.cache_sampled and sampling.get("temperature"):
+            return None
+        payload = [
+            self.model._get_llm_string(stop=stop, **kwargs),
+            sampling,
+            _canonical_messages(messages),
+        ]
+        return hashlib.sha256(json.dumps(payload, default=str).encode()).hexdigest()
+
+    def _lookup(self, messages, stop, kwargs) -> tuple[Optional[str], Optional[AIMessage]]:
+        kwargs = {**self.bound_kwargs, **kwargs}
+        key = self._key(messages, stop, kwargs)
+        return key, None if key is None else self.response_cache.get(key)
+
+    def _store(self, key: Optional[str], message: BaseMessage) -> None:
+        if key is not None:
+            # Without its id, so each reuse gets a fresh one
+            message = message_chunk_to_message(message)
+            self.response_cache.put(key, message.model_copy(update={"id": None}))
+
+    @staticmethod
+    def _result(message: AIMessage) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    @staticmethod
+    def _chunk(message: BaseMessage) -> ChatGenerationChunk:
+        if not isinstance(message, AIMessageChunk):
+            message = AIMessageChunk(
+                content=message.content,
+                id=message.id,
+                tool_call_chunks=[
+                    {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+                    for i, c in enumerate(message.tool_calls)
+                ],
+                response_metadata=message.response_metadata,
+                usage_metadata=message.usage_metadata,
+            )
+        return ChatGenerationChunk(message=message)
+
+    # ``model`` is called through its implementation methods, not ``invoke`` or
+    # ``stream``: those would start a second model run inheriting this run's
+    # callbacks, and every event (and streamed token) would be reported twice
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key, cached = self._lookup(messages, stop, kwargs)
+        if cached is not None:
+            return self._result(cached)
+        result = self.model._generate(
+            messages, stop=stop, run_manager=run_manager, **{**self.bound_kwargs, **kwargs}
+        )
+        self._store(key, result.generations[0].message)
+        return result
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key, cached = self._lookup(messages, stop, kwargs)
+        if cached is not None:
+            return self._result(cached)
+        result = await self.model._agenerate(
+            messages, stop=stop, run_manager=run_manager, **{**self.bound_kwargs, **kwargs}
+        )
+        self._store(key, result.generations[0].message)
+        return result
+
+    def _stream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        key, cached = self._lookup(messages, stop, kwargs)
+        if cached is not None:
+            yield self._chunk(cached)
+            return
+        kwargs = {**self.bound_kwargs, **kwargs}
+        if type(self.model)._stream is BaseChatModel._stream:
+            # Not a streaming model: its whole response is one chunk
+            result = self.model._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            chunks = [self._chunk(result.generations[0].message)]
+        else:
+            # Without the run manager: this run reports each chunk it yields
+            chunks = self.model._stream(messages, stop=stop, **kwargs)
+        message = None
+        for chunk in chunks:
+            message = chunk.message if message is None else message + chunk.message
+            yield chunk
+        if message is not None:
+            self._store(key, message)
+
+    async def _astream(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        key, cached = self._lookup(messages, stop, kwargs)
+        if cached is not None:
+            yield self._chunk(cached)
+            return
+        kwargs = {**self.bound_kwargs, **kwargs}
+        message = None
+        if (
+            type(self.model)._stream is BaseChatModel._stream
+            and type(self.model)._astream is BaseChatModel._astream
+        ):
+            # Not a streaming model: its whole response is one chunk
+            result = await self.model._agenerate(
+                messages, stop=stop, run_manager=run_manager, **kwargs
+            )
+            chunk = self._chunk(result.generations[0].message)
+            message = chunk.message
+            yield chunk
+        else:
+            # Without the run manager: this run reports each chunk it yields
+            async for chunk in self.model._astream(messages, stop=stop, **kwargs):
+                message = chunk.message if message is None else message + chunk.message
+                yield chunk
+        if message is not None:
+            self._store(key, message)
+
+
+_wrapped: "WrapperCache[CachedChatModel]" = WrapperCache()
+
+
+def cached_model(model):
+    """Return ``model`` wrapped in the configured response cache, if any.
+
+    The same wrapper is returned for the same model object and cache while it is
+    in use, so graphs compiled for it can be shared (see ``deepagents.sub_agent``).
+    """
+    cache = settings.response_cache
+    if cache is None:
+        return model
+    if isinstance(model, str):
+        from langchain.chat_models import init_chat_model
+
+        model = init_chat_model(model)
+    if not isinstance(model, BaseChatModel):
+        # e.g. a model already bound to arguments: left uncached
+        return model
+    cache_sampled = settings.cache_sampled
+    return _wrapped.get(
+        model,
+        lambda: CachedChatModel(model=model, response_cache=cache, cache_sampled=cache_sampled),
+        lambda wrapper: (
+            wrapper.model is model
+            and wrapper.response_cache is cache
+            and wrapper.cache_sampled == cache_sampled
+        ),
+    )
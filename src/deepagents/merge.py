@@ -0,0 +1,266 @@
+"""Merging of file changes made concurrently by sub agents.
+
+Sub agents started in the same step all get the same parent ``files``, or the
+part of it their handoff policy selects: the content of each path they are
+given is the version they start from. When a sub agent
+finishes, ``reconcile`` merges its changes three-way (line by line) with those
+of the sub agents of that step that finished before it, and numbers the result:
+every path goes through versions 0 (the parent's content), 1, 2, ... where each
+version contains the changes of all earlier ones. Changes that clash are not
+merged but reported as ``FileConflict``.
+
+The ``files`` update entries are ``FileMerge`` values; ``apply_merge`` (used by
+the ``files`` reducer) keeps the newest version of a path whatever order the
+updates arrive in, and merges three-way with changes made outside the round.
+"""
+
+import threading
+import weakref
+from difflib import SequenceMatcher
+from collections.abc import Mapping
+from typing import Any, NamedTuple, Optional
+
+from typing_extensions import NotRequired, TypedDict
+
+from deepagents.filemap import FileMap
+from deepagents.vfs import decode_content, encode_content, same_value
+
+
+class FileMerge(NamedTuple):
+    """A ``files`` update entry that is merged with concurrent changes to its path.
+
+    ``base`` is the content the change started from and ``value`` the new
+    content (stored values; ``None`` means the file did not exist, or is
+    deleted). ``round`` and ``version`` identify ``value`` among the versions
+    of the path merged by ``reconcile``.
+    """
+
+    base: Any
+    value: Any
+    round: str
+    version: int
+
+
+class FileConflict(TypedDict):
+    """A sub agent's change to a file that clashed with a concurrent change."""
+
+    path: str
+    reason: str
+    # Where the sub agent's version of the file was saved, if it was not deleted
+    saved_as: NotRequired[str]
+
+
+def _hunks(base: list[str], other: list[str]) -> list[tuple[int, int, list[str]]]:
+    """Return the ``(start, end, lines)`` replacements turning ``base`` into ``other``."""
+    matcher = SequenceMatcher(None, base, other, autojunk=False)
+    return [
+        (i1, i2, other[j1:j2])
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def _clash(a: tuple, b: tuple) -> bool:
+    if a[0] == a[1] and b[0] == b[1]:
+        # Insertions at the same point are both kept
+        return False
+    if a[0] == a[1]:
+        return b[0] < a[0] < b[1]
+    if b[0] == b[1]:
+        return a[0] < b[0] < a[1]
+    return a[0] < b[1] and b[0] < a[1]
+
+
+def merge_text(base: str, theirs: str, mine: str) -> tuple[str, list[tuple[int, int]]]:
+    """Merge the changes ``base -> theirs`` and ``base -> mine``.
+
+    Returns the merged text and the conflicting ``(start, end)`` line ranges of
+    ``base`` (1-based, inclusive). Where changes conflict, ``theirs`` is kept.
+    Text appended at the same place by both sides is kept, ``theirs`` first.
+    """
+    if (
+        (not base or base.endswith("\n"))
+        and theirs.startswith(base)
+        and mine.startswith(base)
+    ):
+        # Both sides only appended whole lines: the common case for shared
+        # notes files. Text appended to an unfinished last line goes through
+        # the line merge, which sees both sides changing that line
+        return theirs + mine[len(base) :], []
+    base_lines = base.splitlines(keepends=True)
+    ours = _hunks(base_lines, theirs.splitlines(keepends=True))
+    others = _hunks(base_lines, mine.splitlines(keepends=True))
+    conflicts = []
+    kept = []
+    for hunk in others:
+        clashing = [h for h in ours if _clash(h, hunk)]
+        if not clashing:
+            kept.append(hunk)
+        elif clashing != [hunk]:
+            # The same change made on both sides is not a conflict
+            start = min(hunk[0], *(h[0] for h in clashing))
+            end = max(hunk[1], *(h[1] for h in clashing))
+            conflicts.append((start + 1, max(end, start + 1)))
+    # Insertions go before a replacement starting at the same line
+    changes = sorted(ours + kept, key=lambda h: (h[0], h[1] != h[0]))
+    parts = []
+    pos = 0
+    for start, end, lines in changes:
+        parts.extend(base_lines[pos:start])
+        parts.extend(lines)
+        pos = max(pos, end)
+    parts.extend(base_lines[pos:])
+    return "".join(parts), conflicts
+
+
+def _same(a, b) -> bool:
+    if same_value(a, b):
+        return True
+    if a is None or b is None:
+        return False
+    return decode_content(a) == decode_content(b)
+
+
+def merge_values(base, theirs, mine) -> tuple[Any, Optional[str]]:
+    """Merge two stored values derived from ``base``.
+
+    Returns the merged stored value and, when the changes conflict, a
+    description of the conflict (the merged value then keeps ``theirs``).
+    """
+    if _same(theirs, base) or _same(theirs, mine):
+        return mine, None
+    if _same(mine, base):
+        return theirs, None
+    if theirs is None or mine is None:
+        return theirs, "deleted on one side and changed on the other"
+    text, conflicts = merge_text(
+        "" if base is None else decode_content(base),
+        decode_content(theirs),
+        decode_content(mine),
+    )
+    if conflicts:
+        ranges = ", ".join(
+            f"line {a}" if a == b else f"lines {a}-{b}" for a, b in conflicts
+        )
+        return theirs, f"{ranges} changed on both sides"
+    return encode_content(text), None
+
+
+class _Round:
+    """The versions merged so far from one parent ``files`` value."""
+
+    def __init__(self, round_id: str):
+        self.id = round_id
+        self.lock = threading.Lock()
+        # path -> [version 0 (the parent's content), version 1, ...]
+        self.versions: dict[str, list] = {}
+        self.conflicts = 0
+
+    def latest(self, path: str, default=None):
+        versions = self.versions.get(path)
+        return versions[-1] if versions else default
+
+
+# Rounds by id, which is the ``snapshot_id`` of their parent ``files``
+_rounds: dict[str, _Round] = {}
+_rounds_lock = threading.Lock()
+
+
+def _round(files: FileMap) -> _Round:
+    # Parallel tool calls of one step all receive the same ``files`` object; the
+    # round lives as long as it does
+    key = files.snapshot_id
+    with _rounds_lock:
+        current = _rounds.get(key)
+        if current is None:
+            current = _rounds[key] = _Round(key)
+            weakref.finalize(files, _rounds.pop, key, None)
+        return current
+
+
+def reconcile(parent, base: Mapping, delta: dict) -> tuple[dict, list[FileConflict]]:
+    """Merge a sub agent's ``files`` delta with those of concurrent sub agents.
+
+    ``parent`` is the ``files`` of the step the sub agent was started from and
+    ``base`` the files it was given (``delta`` is relative to them). A path
+    the sub agent wrote without being given it, although the parent has it,
+    is a conflict. Returns the ``files`` update (``FileMerge`` entries, plus a
+    copy of each file whose change clashed) and the conflicts.
+    """
+    if not delta:
+        return delta, []
+    if not isinstance(parent, FileMap):
+        parent = FileMap(parent or {})
+    current = _round(parent)
+    update = {}
+    conflicts = []
+    with current.lock:
+        for path, value in delta.items():
+            start = parent.get(path)
+            latest = current.latest(path, start)
+            if path in base or start is None:
+                new, reason = merge_values(base.get(path), latest, value)
+            elif _same(latest, value):
+                new, reason = value, None
+            else:
+                # The sub agent could not see the file it replaced
+                new, reason = latest, "exists but was not given to the sub agent"
+            if reason is None:
+                versions = current.versions.setdefault(path, [start])
+                versions.append(new)
+                update[path] = FileMerge(base.get(path), new, current.id, len(versions) - 1)
+                continue
+            conflict = FileConflict(path=path, reason=reason)
+            if value is not None:
+                saved_as = path
+                while saved_as in parent or saved_as in current.versions:
+                    current.conflicts += 1
+                    saved_as = f"{path}.conflict-{current.conflicts}"
+                current.versions[saved_as] = [None, value]
+                update[saved_as] = FileMerge(None, value, current.id, 1)
+                conflict["saved_as"] = saved_as
+            conflicts.append(conflict)
+    return update, conflicts
+
+
+def replace_if_unchanged(base, value) -> FileMerge:
+    """Return a ``files`` update entry setting ``value`` if the path still holds ``base``.
+
+    If a concurrent update changed the path first, that change is kept.
+    """
+    # No round: applied as a three-way merge, where only ``base`` -> ``value``
+    # keeping the same text gives way to any other change
+    return FileMerge(base, value, "", 0)
+
+
+def _version(entry: FileMerge, path: str, value) -> Optional[int]:
+    """Return which version of ``path`` in ``entry``'s round ``value`` is, if any."""
+    # Unknown if the round's parent ``files`` is gone, or the entry was made by
+    # another process (e.g. replayed from a checkpoint)
+    current = _rounds.get(entry.round)
+    if current is None:
+        return None
+    # Compared by content: values may have been copied on the way (e.g. when a
+    # checkpointer is used)
+    versions = current.versions.get(path, ())
+    for number in range(len(versions) - 1, -1, -1):
+        if _same(versions[number], value):
+            return number
+    return None
+
+
+def newer(entry: FileMerge, other: FileMerge) -> FileMerge:
+    """Return whichever of two entries for the same path holds the newer version."""
+    if entry.round == other.round and other.version > entry.version:
+        return other
+    return entry
+
+
+def apply_merge(path: str, current, entry: FileMerge):
+    """Return the content of ``path`` after applying ``entry`` to ``current``."""
+    version = _version(entry, path, current)
+    if version is not None:
+        # Keep whichever version came later, it contains the other one
+        return entry.value if version < entry.version else current
+    value, _ = merge_values(entry.base, current, entry.value)
+    return value
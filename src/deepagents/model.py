@@ -1,6 +1,115 @@
+import asyncio
 import os
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import aiohttp
+import requests
 from dotenv import load_dotenv
 from langchain_nvidia_ai_endpoints import ChatNVIDIA
+from requests.adapters import HTTPAdapter
+
+from deepagents.cache import ResultCache
+from deepagents.settings import update_settings
+
+
+@dataclass
+class ModelSettings:
+    """Process-wide settings for the clients created by ``get_default_model``.
+
+    Attributes:
+        pool_maxsize: Keep-alive connections kept open to the endpoint, per
+            client (and per event loop for async calls).
+        timeout: Seconds to wait when connecting to, or reading from, the
+            endpoint. ``None`` keeps the client's default.
+        response_cache: When set, ``create_deep_agent`` reuses the responses of
+            identical model calls from this cache (see ``deepagents.llm_cache``).
+        cache_sampled: Whether calls with a non-zero temperature are cached
+            too. Their sampling parameters are always part of the cache key.
+    """
+
+    pool_maxsize: int = 32
+    timeout: Optional[float] = None
+    response_cache: Optional[ResultCache] = None
+    cache_sampled: bool = True
+
+
+settings = ModelSettings()
+
+
+def configure_model(**changes: Any) -> ModelSettings:
+    """Update the process-wide ``ModelSettings`` and return them.
+
+    Models returned before the change keep the settings they were created with.
+
+    Example:
+        configure_model(pool_maxsize=64, timeout=120)
+    """
+    return update_settings(settings, "model", changes)
+
+
+_clients: dict[tuple, ChatNVIDIA] = {}
+_clients_lock = threading.Lock()
+_dotenv_loaded = False
+
+
+class _Pool:
+    """Connections shared by every request of one model client."""
+
+    def __init__(self, verify, ssl_context, timeout: Optional[float], maxsize: int):
+        self.timeout = timeout
+        self.maxsize = maxsize
+        self.ssl_context = ssl_context
+        self.session = requests.Session()
+        self.session.verify = verify
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=maxsize))
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=maxsize))
+        # aiohttp connectors are bound to the event loop they are created on
+        self._connectors: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.TCPConnector]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def get_session(self) -> requests.Session:
+        return self.session
+
+    def get_async_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        connector = self._connectors.get(loop)
+        if connector is None or connector.closed:
+            connector = aiohttp.TCPConnector(ssl=self.ssl_context, limit=self.maxsize)
+            self._connectors[loop] = connector
+        timeout = aiohttp.ClientTimeout(
+            connect=self.timeout, sock_connect=self.timeout, sock_read=self.timeout
+        )
+        # The client closes its session after each request; the connector, and
+        # the connections it keeps alive, stay open
+        return aiohttp.ClientSession(
+            connector=connector, connector_owner=False, timeout=timeout
+        )
+
+
+def _share_connections(model: ChatNVIDIA) -> None:
+    """Make ``model`` reuse keep-alive connections instead of a session per request."""
+    sync_client = getattr(model, "_client", None)
+    async_client = getattr(model, "_async_client", None)
+    if not hasattr(sync_client, "get_session_fn") or not hasattr(
+        async_client, "get_async_session_fn"
+    ):
+        # Older versions of the integration manage their own sessions
+        return
+    if settings.timeout is not None:
+        sync_client.timeout = async_client.timeout = settings.timeout
+    build_ssl_context = getattr(async_client, "_build_ssl_context", None)
+    pool = _Pool(
+        sync_client.verify_ssl,
+        build_ssl_context() if build_ssl_context else True,
+        async_client.timeout,
+        settings.pool_maxsize,
+    )
+    sync_client.get_session_fn = pool.get_session
+    async_client.get_async_session_fn = pool.get_async_session
 
 
 def get_default_model():
@@ -9,14 +118,21 @@ def get_default_model():
     Defaults to NVIDIA's GPT-OSS 20B via the LangChain NVIDIA AI Endpoints integration.
     Reads API key from environment (preferred), but can also work if the NVIDIA
     client is configured globally.
+
+    The client is created once per configuration and shared by every caller in
+    the process, together with its pool of keep-alive connections (see
+    ``configure_model``).
     """
 
-    # Load environment variables from a .env file if present
-    load_dotenv()
+    # Load environment variables from a .env file if present (once: it searches
+    # the file system)
+    global _dotenv_loaded
+    if not _dotenv_loaded:
+        load_dotenv()
+        _dotenv_loaded = True
 
     # Prefer environment variables rather than hardcoding secrets
     api_key = os.getenv("NVIDIA_API_KEY")
-    
 
     init_kwargs = {
         "model": "openai/gpt-oss-20b",
@@ -26,4 +142,11 @@ def get_default_model():
         "max_tokens": 4096,
     }
 
-    return ChatNVIDIA(**init_kwargs)
+    key = tuple(sorted(init_kwargs.items())) + (settings.pool_maxsize, settings.timeout)
+    with _clients_lock:
+        model = _clients.get(key)
+        if model is None:
+            model = _clients[key] = ChatNVIDIA(**init_kwargs)
+            _share_connections(model)
+    return model
+
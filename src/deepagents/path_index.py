@@ -0,0 +1,136 @@
+"""Prefix tree of file paths, kept next to the ``files`` map.
+
+``PathTrie`` is persistent like ``FileMap``: adding or removing a path copies
+only the directories along that path. ``FileMap`` carries one once it has been
+asked for it, so listing a directory, matching a glob or paging with a cursor
+costs the size of the result rather than the size of the workspace.
+"""
+
+from typing import Iterator, Optional
+
+from deepagents.filemap import FileMap
+
+_GLOB_CHARS = set("*?[")
+
+
+def split_path(path: str) -> tuple[str, ...]:
+    return tuple(path.split("/"))
+
+
+class PathTrie:
+    """Immutable trie of ``/``-separated paths.
+
+    Each node knows whether its own path is a file and how many files are at or
+    below it.
+    """
+
+    __slots__ = ("children", "is_file", "count", "_names")
+
+    def __init__(self, children: Optional[FileMap] = None, is_file: bool = False, count: int = 0):
+        self.children = children if children is not None else FileMap()
+        self.is_file = is_file
+        self.count = count
+        self._names = None
+
+    @classmethod
+    def build(cls, paths) -> "PathTrie":
+        trie = cls()
+        for path in paths:
+            trie = trie.add(path)
+        return trie
+
+    def add(self, path: str) -> "PathTrie":
+        return self._add(split_path(path), 0)
+
+    def _add(self, segments: tuple, i: int) -> "PathTrie":
+        if i == len(segments):
+            if self.is_file:
+                return self
+            return PathTrie(self.children, True, self.count + 1)
+        child = self.children.get(segments[i]) or _EMPTY
+        new_child = child._add(segments, i + 1)
+        if new_child is child:
+            return self
+        return PathTrie(
+            self.children.set(segments[i], new_child), self.is_file, self.count + 1
+        )
+
+    def remove(self, path: str) -> "PathTrie":
+        return self._remove(split_path(path), 0)
+
+    def _remove(self, segments: tuple, i: int) -> "PathTrie":
+        if i == len(segments):
+            if not self.is_file:
+                return self
+            return PathTrie(self.children, False, self.count - 1)
+        child = self.children.get(segments[i])
+        if child is None:
+            return self
+        new_child = child._remove(segments, i + 1)
+        if new_child is child:
+            return self
+        if new_child.count:
+            children = self.children.set(segments[i], new_child)
+        else:
+            children = self.children.delete(segments[i])
+        return PathTrie(children, self.is_file, self.count - 1)
+
+    def find(self, segments: tuple) -> Optional["PathTrie"]:
+        node = self
+        for segment in segments:
+            node = node.children.get(segment)
+            if node is None:
+                return None
+        return node
+
+    def _sorted_names(self) -> list:
+        # Nodes are immutable, so the sorted child names can be cached
+        if self._names is None:
+            self._names = sorted(self.children)
+        return self._names
+
+    def iter_paths(self, prefix: str = "", after: Optional[str] = None) -> Iterator[str]:
+        """Yield paths under the directory ``prefix`` in sorted order.
+
+        Paths are ordered segment by segment. With ``after``, only paths that
+        sort after it are yielded, and whole subtrees before it are skipped.
+        """
+        base = split_path(prefix.rstrip("/")) if prefix.rstrip("/") else ()
+        node = self.find(base)
+        if node is None:
+            return
+        cursor = split_path(after) if after else None
+        if cursor is not None and cursor[: len(base)] != base:
+            if cursor[: len(base)] > base:
+                return
+            cursor = None
+        yield from node._walk(list(base), cursor)
+
+    def _walk(self, segments: list, cursor: Optional[tuple]) -> Iterator[str]:
+        # ``cursor`` is only set while ``segments`` is a prefix of it
+        depth = len(segments)
+        if self.is_file and cursor is None:
+            yield "/".join(segments)
+        for name in self._sorted_names():
+            child_cursor = None
+            if cursor is not None and depth < len(cursor):
+                if name < cursor[depth]:
+                    continue
+                if name == cursor[depth]:
+                    child_cursor = cursor
+            segments.append(name)
+            yield from self.children[name]._walk(segments, child_cursor)
+            segments.pop()
+
+
+_EMPTY = PathTrie()
+
+
+def glob_prefix(pattern: str) -> str:
+    """Return the leading directories of ``pattern`` that contain no wildcards."""
+    literal = []
+    for segment in split_path(pattern)[:-1]:
+        if _GLOB_CHARS & set(segment):
+            break
+        literal.append(segment)
+    return "/".join(literal)
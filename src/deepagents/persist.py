@@ -0,0 +1,213 @@
+"""Best-effort mirroring of virtual files to the local disk.
+
+``write_file``/``edit_file`` hand their result to a write-behind persister
+instead of writing synchronously: a background thread collects pending writes,
+keeps only the latest content per path, and writes them in batches. Call
+``flush_disk_writes()`` (or ``await aflush_disk_writes()``) when a run ends to
+make sure everything reached the disk.
+
+``append_file`` only sends the appended text: when the file on disk is known to
+hold the content being appended to, the text is appended to it instead of
+rewriting the whole file.
+"""
+
+import asyncio
+import atexit
+import os
+import threading
+import uuid
+import weakref
+from pathlib import Path
+from typing import Optional, Union
+
+from deepagents.vfs import decode_content, settings
+
+
+def _write_now(path: Path, content) -> None:
+    # Write a temporary file and move it over ``path``, so a concurrent reader
+    # sees either the old or the new content, never a truncated file
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(decode_content(content), encoding="utf-8")
+        os.replace(tmp, path)
+    except Exception:
+        # Do not fail the tool on disk write errors; the in-memory state is the
+        # source of truth
+        try:
+            tmp.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+def _append_now(path: Path, text: str) -> None:
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(text)
+    except Exception:
+        pass
+
+
+class _Append:
+    """Pending appends to a file, in order."""
+
+    __slots__ = ("chunks",)
+
+    def __init__(self, text: str):
+        self.chunks = [text]
+
+
+class WriteBehindPersister:
+    """Coalescing, batched background writer.
+
+    Args:
+        max_pending: Maximum number of distinct paths waiting to be written.
+            Writers block when it is reached, so memory stays bounded.
+        batch_delay: Seconds to wait after the first pending write so that
+            further writes can be coalesced into the same batch.
+    """
+
+    def __init__(self, max_pending: int = 256, batch_delay: float = 0.05):
+        self.max_pending = max_pending
+        self.batch_delay = batch_delay
+        self._pending: dict[Path, object] = {}
+        self._cond = threading.Condition()
+        self._queued = 0  # sequence number of the last queued write
+        self._written = 0  # every write up to this sequence number is on disk
+        self._flushers = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def write(self, path: Path, content) -> None:
+        """Queue ``content`` to be written to ``path``, replacing any pending write."""
+        with self._cond:
+            while len(self._pending) >= self.max_pending and path not in self._pending:
+                self._cond.wait()
+            self._pending[path] = content
+            self._enqueued()
+
+    def append(self, path: Path, text: str, content) -> None:
+        """Queue appending ``text`` to ``path``, whose new full content is ``content``.
+
+        If a full write of ``path`` is still pending, it is replaced by a write of
+        ``content`` instead.
+        """
+        with self._cond:
+            while len(self._pending) >= self.max_pending and path not in self._pending:
+                self._cond.wait()
+            pending = self._pending.get(path)
+            if path not in self._pending:
+                self._pending[path] = _Append(text)
+            elif isinstance(pending, _Append):
+                pending.chunks.append(text)
+            else:
+                self._pending[path] = content
+            self._enqueued()
+
+    def _enqueued(self) -> None:
+        self._queued += 1
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="deepagents-write-behind", daemon=True
+            )
+            self._thread.start()
+        self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every write queued so far is on disk.
+
+        Returns ``False`` if ``timeout`` expired first.
+        """
+        with self._cond:
+            target = self._queued
+            self._flushers += 1
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(lambda: self._written >= target, timeout)
+            finally:
+                self._flushers -= 1
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                # Give repeated writes to the same paths a chance to coalesce,
+                # unless someone is waiting on a flush or the queue is full
+                self._cond.wait_for(
+                    lambda: self._flushers or len(self._pending) >= self.max_pending,
+                    self.batch_delay,
+                )
+                batch, self._pending = self._pending, {}
+                seq = self._queued
+                self._cond.notify_all()
+            for path, content in batch.items():
+                if isinstance(content, _Append):
+                    _append_now(path, "".join(content.chunks))
+                else:
+                    _write_now(path, content)
+            with self._cond:
+                self._written = seq
+                self._cond.notify_all()
+
+
+_persister = WriteBehindPersister()
+atexit.register(_persister.flush)
+
+
+def get_persister() -> WriteBehindPersister:
+    """Return the process-wide persister used by the file system tools."""
+    return _persister
+
+
+def resolve_disk_path(file_path: Union[str, Path]) -> Path:
+    """Return where ``file_path`` is mirrored: relative paths are under the CWD."""
+    path_obj = Path(file_path)
+    if not path_obj.is_absolute():
+        path_obj = Path.cwd() / file_path
+    return path_obj
+
+
+# Last appendable value mirrored to each path, so appends can be sent as such
+_mirrored: "weakref.WeakValueDictionary[Path, object]" = weakref.WeakValueDictionary()
+_mirrored_lock = threading.Lock()
+
+
+def mirror_file(file_path: str, content) -> None:
+    """Mirror a virtual file to disk, in the background unless disabled."""
+    path_obj = resolve_disk_path(file_path)
+    with _mirrored_lock:
+        _mirrored.pop(path_obj, None)
+    if settings.disk_write_behind:
+        _persister.write(path_obj, content)
+    else:
+        _write_now(path_obj, content)
+
+
+def mirror_append(file_path: str, old_value, new_value, text: str) -> None:
+    """Mirror an append of ``text`` that turned ``old_value`` into ``new_value``.
+
+    Only ``text`` is written if ``old_value`` is what was last mirrored to the
+    path; otherwise the whole file is rewritten.
+    """
+    path_obj = resolve_disk_path(file_path)
+    with _mirrored_lock:
+        in_sync = old_value is not None and _mirrored.get(path_obj) is old_value
+        _mirrored[path_obj] = new_value
+    if settings.disk_write_behind:
+        if in_sync:
+            _persister.append(path_obj, text, new_value)
+        else:
+            _persister.write(path_obj, new_value)
+    elif in_sync:
+        _append_now(path_obj, text)
+    else:
+        _write_now(path_obj, new_value)
+
+
+def flush_disk_writes(timeout: Optional[float] = None) -> bool:
+    """Durability barrier: wait until every mirrored file is written to disk."""
+    return _persister.flush(timeout)
+
+
+async def aflush_disk_writes(timeout: Optional[float] = None) -> bool:
+    """Async version of ``flush_disk_writes`` that does not block the event loop."""
+    return await asyncio.to_thread(_persister.flush, timeout)
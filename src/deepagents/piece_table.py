@@ -0,0 +1,153 @@
+"""Piece-table text representation for files that are edited many times.
+
+A ``PieceTable`` is an immutable sequence of ``(source, start, end)`` slices of
+existing strings. Replacing a range only rebuilds the (short) tuple of pieces and
+adds the new text as one more source, so an edit costs the size of the edit
+rather than a copy of the whole file. The flat string is only built when the file
+is read or persisted.
+"""
+
+from typing import Iterator, Optional
+
+from deepagents.serde import AsText
+
+# Flatten back into a single piece once edits have fragmented the table this much
+_MAX_PIECES = 512
+
+
+class PieceTable(AsText):
+    """Immutable text assembled from slices of other strings."""
+
+    __slots__ = ("pieces", "length")
+
+    def __init__(self, text: str = ""):
+        self.pieces: tuple = ((text, 0, len(text)),) if text else ()
+        self.length = len(text)
+
+    @classmethod
+    def _from_pieces(cls, pieces: list) -> "PieceTable":
+        table = cls.__new__(cls)
+        table.pieces = tuple(pieces)
+        table.length = sum(end - start for _, start, end in pieces)
+        if len(table.pieces) > _MAX_PIECES:
+            return cls(str(table))
+        return table
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __str__(self) -> str:
+        if len(self.pieces) == 1:
+            source, start, end = self.pieces[0]
+            if start == 0 and end == len(source):
+                return source
+        return "".join(source[start:end] for source, start, end in self.pieces)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, PieceTable):
+            other = str(other)
+        return isinstance(other, str) and str(self) == other
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"PieceTable(length={self.length}, pieces={len(self.pieces)})"
+
+    def substring(self, start: int, end: int) -> str:
+        """Return ``str(self)[start:end]`` without building the whole string."""
+        start, end = max(start, 0), min(end, self.length)
+        if start >= end:
+            return ""
+        parts = []
+        pos = 0
+        for source, s, e in self.pieces:
+            piece_end = pos + (e - s)
+            if piece_end > start and pos < end:
+                parts.append(source[s + max(start - pos, 0) : s + min(end, piece_end) - pos])
+            if piece_end >= end:
+                break
+            pos = piece_end
+        return "".join(parts)
+
+    def find_all(self, needle: str, start: int = 0) -> Iterator[int]:
+        """Yield non-overlapping positions of ``needle``, left to right.
+
+        Each piece is searched in place with ``str.find``; only the few characters
+        around piece boundaries are copied.
+        """
+        n = len(needle)
+        pos = 0  # absolute offset of the current piece
+        carry = ""  # last n - 1 characters before ``pos``
+        next_allowed = start
+        for source, s, e in self.pieces:
+            if carry:
+                window = carry + source[s : min(e, s + n - 1)]
+                i = window.find(needle)
+                while i != -1 and i < len(carry):
+                    found = pos - len(carry) + i
+                    if found >= next_allowed:
+                        yield found
+                        next_allowed = found + n
+                    i = window.find(needle, i + 1)
+            j = source.find(needle, s + max(0, next_allowed - pos), e)
+            while j != -1:
+                found = pos + j - s
+                yield found
+                next_allowed = found + n
+                j = source.find(needle, j + n, e)
+            if n > 1:
+                carry = (carry + source[max(s, e - n + 1) : e])[-(n - 1) :]
+            pos += e - s
+
+    def find(self, sub: str, start: int = 0) -> int:
+        if not sub:
+            return start if start <= self.length else -1
+        return next(self.find_all(sub, start), -1)
+
+    def count(self, sub: str) -> int:
+        if not sub:
+            return self.length + 1
+        return sum(1 for _ in self.find_all(sub))
+
+    def splice(self, start: int, end: int, text: str) -> "PieceTable":
+        """Return a new table with ``[start, end)`` replaced by ``text``."""
+        return self.splice_many([(start, end, text)])
+
+    def replace(self, old: str, new: str, count: Optional[int] = None) -> "PieceTable":
+        """Like ``str.replace``: replace up to ``count`` occurrences (all by default)."""
+        if not old:
+            return PieceTable(str(self).replace(old, new, -1 if count is None else count))
+        edits = []
+        for found in self.find_all(old):
+            if count is not None and len(edits) >= count:
+                break
+            edits.append((found, found + len(old), new))
+        return self.splice_many(edits) if edits else self
+
+    def splice_many(self, edits: list) -> "PieceTable":
+        """Return a new table with every ``(start, end, text)`` edit applied.
+
+        ``edits`` must be sorted and non-overlapping, with offsets into this table.
+        """
+        pieces = []
+        k = 0
+        skip_until = 0  # text before this absolute offset has been replaced
+        piece_start = 0
+        for source, s, e in self.pieces:
+            piece_end = piece_start + (e - s)
+            cursor = max(piece_start, skip_until)
+            while k < len(edits) and edits[k][0] <= piece_end:
+                start, end, text = edits[k]
+                if start > cursor:
+                    pieces.append((source, s + cursor - piece_start, s + start - piece_start))
+                if text:
+                    pieces.append((text, 0, len(text)))
+                cursor = skip_until = max(cursor, end)
+                k += 1
+            if cursor < piece_end:
+                pieces.append((source, s + cursor - piece_start, e))
+            piece_start = piece_end
+        for _, _, text in edits[k:]:
+            if text:
+                pieces.append((text, 0, len(text)))
+        return PieceTable._from_pieces(pieces)
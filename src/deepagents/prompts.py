@@ -275,3 +275,42 @@ Usage:
 - Results are returned using cat -n format, with line numbers starting at 1
 - You have the capability to call multiple tools in a single response. It is always better to speculatively read multiple files as a batch that are potentially useful. 
 - If you read a file that exists but has empty contents you will receive a system reminder warning in place of file contents."""
+GREP_DESCRIPTION = """Searches the contents of all files in the filesystem for a regular expression and returns every matching line.
+
+Usage:
+- Use this tool to find which files (and which lines) mention something, instead of reading files one by one
+- The pattern uses Python regular expression syntax (e.g. "error.*timeout", "def \\w+"). Escape special characters to search for them literally
+- Use the `path` parameter to restrict the search to files matching a glob pattern (e.g. "*.md", "notes/*")
+- Set `ignore_case` to True for a case-insensitive search
+- Results are returned one per line as `file_path:line_number: line content`, with line numbers starting at 1
+- At most `max_results` matching lines are returned (100 by default)
+- Use the `read_file` tool with an offset to see the lines around a match"""
+LS_DESCRIPTION = """Lists the paths of files in the filesystem, in sorted order.
+
+Usage:
+- Call it without parameters to list every file
+- Use the `path` parameter to only list files under a directory (e.g. "notes" or "/workspace/src")
+- Use the `pattern` parameter to only list files matching a glob pattern (e.g. "*.md", "notes/*.txt")
+- At most `limit` paths are returned (500 by default). If more files match, the last entry is a system reminder with a `cursor` to pass to the next call to get the following page"""
+MULTI_EDIT_DESCRIPTION = """Makes several exact string replacements in one file in a single call.
+
+Usage:
+- Prefer this tool over several `edit_file` calls when you need to make multiple changes to the same file
+- `edits` is a list of objects with `old_string`, `new_string` and optionally `replace_all`, with the same meaning as for `edit_file`
+- Every `old_string` is matched against the file as it is before this call, so one edit cannot match text produced by another
+- The edits must not overlap. Combine changes to the same region into a single edit
+- All edits are checked before any is applied: if one fails (string not found, or not unique without `replace_all`), the file is left unchanged and an error names the failing edit
+- You must use your `Read` tool at least once in the conversation before editing, and preserve the exact indentation shown after the line number prefix"""
+APPEND_DESCRIPTION = """Appends content to the end of a file, creating the file if it does not exist.
+
+Usage:
+- Use this tool to build long files (such as reports) section by section: write or append the first section, then append each following section
+- Only the new content is sent; the existing content of the file is not needed and is left untouched
+- The content is added exactly as given. Include a leading newline if the file does not already end with one"""
+TASK_BATCH_DESCRIPTION = """Launch several agents at once and wait for all of them to finish.
+
+Usage:
+- `tasks` is a list of objects with a `description` and a `subagent_type`, with the same meaning as for the `task` tool
+- The tasks run concurrently, so only batch tasks that are independent of each other
+- The results are returned together, in the same order as `tasks`, each under a `## Task N` heading
+- Prefer this tool over several `task` calls when you want to fan out many research or analysis tasks in one step"""
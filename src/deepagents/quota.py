@@ -0,0 +1,171 @@
+"""Per-thread memory quotas for the virtual file system.
+
+With ``configure_vfs(thread_quota_bytes=...)``, each thread's resident file
+contents are tracked in least-recently-used order (by writes, reads and edits).
+When a write takes a thread over its quota, the coldest files are moved to the
+spill store (see ``deepagents.vfs.spill_store``) and replaced in state by a
+``BlobRef``. Spilled files stay fully readable and editable: ``read_file``
+moves a spilled file back into state (``page_in``), spilling colder files in
+its place, and edits store the new content in state as any write does.
+
+Usage is tracked per ``deepagents.vfs.current_scope``, so each sub agent run
+has its own. Runs without a thread id have no tracked usage: each write
+measures the files it is given, and the coldest are taken in path order.
+"""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Optional
+
+from deepagents.blobs import BlobRef
+from deepagents.chunked_text import ChunkedText
+from deepagents.compression import CompressedText
+from deepagents.piece_table import PieceTable
+from deepagents.merge import replace_if_unchanged
+from deepagents.vfs import decode_content, encode_content, settings, spill_store
+
+_MAX_THREADS = 64
+
+
+def resident_size(value) -> int:
+    """Approximate number of bytes ``value`` keeps in state."""
+    if isinstance(value, BlobRef):
+        return 0
+    if isinstance(value, CompressedText):
+        return len(value.data)
+    if isinstance(value, (PieceTable, ChunkedText)):
+        return value.length
+    return len(value)
+
+
+class ThreadUsage:
+    """Resident size of every file of one thread, in least-recently-used order."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # path -> (stored value the size was measured on, its resident size)
+        self._entries: "OrderedDict[str, tuple[object, int]]" = OrderedDict()
+        self.resident = 0
+
+    def _set(self, path: str, value, recent: bool = True) -> None:
+        old = self._entries.get(path)
+        if old is not None:
+            self.resident -= old[1]
+        size = resident_size(value)
+        self._entries[path] = (value, size)
+        self.resident += size
+        if recent:
+            self._entries.move_to_end(path)
+
+    def _drop(self, path: str) -> None:
+        old = self._entries.pop(path, None)
+        if old is not None:
+            self.resident -= old[1]
+
+    def _sync(self, files: Mapping) -> None:
+        # Files written by other means are picked up as the coldest entries
+        for path in [p for p in self._entries if p not in files]:
+            self._drop(path)
+        for path, value in files.items():
+            entry = self._entries.get(path)
+            if entry is None:
+                self._set(path, value)
+                self._entries.move_to_end(path, last=False)
+            elif entry[0] is not value:
+                self._set(path, value, recent=False)
+
+    def touch(self, path: str) -> None:
+        """Mark ``path`` as the most recently used file."""
+        with self._lock:
+            if path in self._entries:
+                self._entries.move_to_end(path)
+
+    def spill(self, files: Mapping, written: Mapping, quota: int) -> dict:
+        """Record ``written`` on top of ``files`` and spill files beyond ``quota``.
+
+        Returns the ``{path: BlobRef}`` updates for the spilled files.
+        """
+        spilled = {}
+        with self._lock:
+            if len(self._entries) != len(files):
+                self._sync(files)
+            for path, value in written.items():
+                self._set(path, value)
+            for path, (value, size) in list(self._entries.items()):
+                if self.resident <= quota:
+                    break
+                current = written.get(path, files.get(path))
+                if current is None:
+                    self._drop(path)
+                    continue
+                if current is not value:
+                    self._set(path, current, recent=False)
+                    value, size = current, self._entries[path][1]
+                if not size:
+                    continue
+                ref = spill_store().put(decode_content(value))
+                spilled[path] = ref
+                self._set(path, ref, recent=False)
+        return spilled
+
+
+_usage: "OrderedDict[object, ThreadUsage]" = OrderedDict()
+_usage_lock = threading.Lock()
+
+
+def get_thread_usage(key) -> ThreadUsage:
+    """Return the usage tracker for ``key`` (see ``deepagents.vfs.current_scope``).
+
+    ``None`` gets a new, untracked ``ThreadUsage``.
+    """
+    if key is None:
+        return ThreadUsage()
+    with _usage_lock:
+        usage = _usage.get(key)
+        if usage is None:
+            usage = _usage[key] = ThreadUsage()
+            while len(_usage) > _MAX_THREADS:
+                _usage.popitem(last=False)
+        _usage.move_to_end(key)
+        return usage
+
+
+def touch_file(scope, path: str) -> None:
+    """Record a read of ``path``; a no-op unless a quota is configured."""
+    if settings.thread_quota_bytes is not None and scope is not None:
+        get_thread_usage(scope).touch(path)
+
+
+def spill_cold_files(scope, files: Optional[Mapping], written: Mapping) -> dict:
+    """Return ``{path: BlobRef}`` updates keeping the thread within its quota.
+
+    ``files`` is the state before the write and ``written`` the new stored
+    values. Returns an empty dict unless a quota is configured.
+    """
+    quota = settings.thread_quota_bytes
+    if quota is None:
+        return {}
+    return get_thread_usage(scope).spill(files or {}, written, quota)
+
+
+def page_in(scope, files: Mapping, path: str, text: str) -> dict:
+    """Return the ``files`` updates moving ``path`` back into state after a read.
+
+    ``text`` is the content of ``path``. Returns an empty dict unless a quota is
+    configured, ``path`` is spilled and ``text`` fits in the quota. Files made
+    cold by it are spilled in its place.
+    """
+    quota = settings.thread_quota_bytes
+    value = files.get(path)
+    if quota is None or not isinstance(value, BlobRef):
+        return {}
+    stored = encode_content(text)
+    if isinstance(stored, BlobRef) or resident_size(stored) > quota:
+        # Kept in the blob store by configuration, or it would be spilled again
+        return {}
+    written = {path: stored}
+    updates = spill_cold_files(scope, files, written)
+    # A concurrent edit of the file wins over putting back its old content
+    updates[path] = replace_if_unchanged(value, stored)
+    return updates
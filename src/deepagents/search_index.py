@@ -0,0 +1,244 @@
+"""Trigram index used by the ``grep`` tool.
+
+Each thread, and each sub agent run in it, gets an inverted index from
+case-folded trigram to the paths that contain it. It is built lazily: writes
+do not touch it, and ``grep`` re-syncs the index against the state it is given
+(a cheap identity check per file), indexing only the files that changed since
+its last call. ``edit_file`` and ``append_file`` re-count the trigrams around
+the changed range of files that are already indexed. Only files containing
+every trigram of the pattern's literal parts are actually scanned. Runs
+without a thread id are not indexed.
+"""
+
+import re
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from collections.abc import Mapping
+from typing import Callable, Iterator, Optional
+
+from deepagents.vfs import same_value
+
+_MAX_INDEXES = 64
+
+
+def _trigrams(text: str) -> Iterator[str]:
+    # ``casefold`` maps characters independently of context, so the trigrams of
+    # a literal are always a subset of those of any text containing it
+    text = text.casefold()
+    return (text[i : i + 3] for i in range(len(text) - 2))
+
+
+_BREAK = set(".^$+)]|")
+
+
+def _skip_group(pattern: str, i: int) -> int:
+    """Return the index just past the group or class starting at ``pattern[i]``."""
+    close = ")" if pattern[i] == "(" else "]"
+    depth = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 2
+            continue
+        if close == ")" and char == "(":
+            depth += 1
+        elif char == close and (close == "]" or depth == 1):
+            return i + 1
+        elif char == ")":
+            depth -= 1
+        i += 1
+    return i
+
+
+# Escapes followed by the code of a character: ``\x41``, ``\u0041``, ``\U00000041``
+_CODE_ESCAPES = {"x": 2, "u": 4, "U": 8}
+
+# An inline flag group turning on verbose mode, e.g. ``(?x)`` or ``(?ix:...)``,
+# where whitespace and comments are not part of the pattern
+_VERBOSE = re.compile(r"\(\?[a-zA-Z]*x[a-zA-Z-]*[:)]")
+
+
+def _escape_end(pattern: str, i: int) -> int:
+    """Return the index just past the escape whose letter or digit is at ``pattern[i]``."""
+    char = pattern[i]
+    if char in _CODE_ESCAPES:
+        return i + 1 + _CODE_ESCAPES[char]
+    if char == "N" and pattern.startswith("{", i + 1):
+        end = pattern.find("}", i)
+        return len(pattern) if end == -1 else end + 1
+    if char.isdigit():
+        # Octal escape (up to three digits) or group reference (up to two)
+        end = i + 1
+        while end < min(i + 3, len(pattern)) and pattern[end].isdigit():
+            end += 1
+        return end
+    return i + 1
+
+
+def required_literals(pattern: str) -> list[str]:
+    """Return substrings every match of the regex ``pattern`` must contain.
+
+    This is deliberately conservative: any alternation or verbose mode disables
+    filtering, groups, classes and escapes of letters or digits end a literal
+    run, and a quantified character is dropped from it.
+    """
+    if "|" in pattern or _VERBOSE.search(pattern):
+        return []
+    literals = []
+    run = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern):
+            escaped = pattern[i + 1]
+            if escaped.isalnum():
+                # Character class (\d, \w, ...), anchor (\b, \A, ...) or a
+                # character given by its code (\x41, \101, \N{...}, ...)
+                literals.append("".join(run))
+                run = []
+                i = _escape_end(pattern, i + 1)
+            else:
+                run.append(escaped)
+                i += 2
+            continue
+        if char in "*?{":
+            # The previous character is optional or repeated
+            if run:
+                run.pop()
+            literals.append("".join(run))
+            run = []
+            if char == "{":
+                end = pattern.find("}", i)
+                i = len(pattern) if end == -1 else end
+        elif char in "([":
+            literals.append("".join(run))
+            run = []
+            i = _skip_group(pattern, i)
+            continue
+        elif char in _BREAK:
+            literals.append("".join(run))
+            run = []
+        else:
+            run.append(char)
+        i += 1
+    literals.append("".join(run))
+    return [literal for literal in literals if len(literal) >= 3]
+
+
+class TrigramIndex:
+    """Inverted trigram index over the files of one thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: dict[str, set[str]] = defaultdict(set)
+        # path -> (stored value the entry was built from, its trigram counts)
+        self._docs: dict[str, tuple[object, Counter]] = {}
+
+    def _remove(self, path: str) -> None:
+        entry = self._docs.pop(path, None)
+        if entry is None:
+            return
+        for gram in entry[1]:
+            paths = self._postings.get(gram)
+            if paths is not None:
+                paths.discard(path)
+                if not paths:
+                    del self._postings[gram]
+
+    def _update(self, path: str, value, text: str) -> None:
+        counts = Counter(_trigrams(text))
+        self._remove(path)
+        self._docs[path] = (value, counts)
+        for gram in counts:
+            self._postings[gram].add(path)
+
+    def update(self, path: str, value, text: str) -> None:
+        """Index ``text`` as the content of ``path`` (stored in state as ``value``)."""
+        with self._lock:
+            self._update(path, value, text)
+
+    def apply_edit(self, path: str, old_value, new_value, removed: str, added: str) -> None:
+        """Update ``path`` for an edit of its content from ``old_value`` to ``new_value``.
+
+        ``removed``/``added`` are the replaced and replacement text, each with the
+        two unchanged characters on either side. If the index does not hold
+        ``old_value`` the edit is ignored and the next ``sync`` reindexes the file.
+        """
+        with self._lock:
+            entry = self._docs.get(path)
+            if entry is None or not same_value(entry[0], old_value):
+                return
+            counts = entry[1]
+            for gram in _trigrams(removed):
+                counts[gram] -= 1
+                if counts[gram] <= 0:
+                    del counts[gram]
+                    paths = self._postings.get(gram)
+                    if paths is not None:
+                        paths.discard(path)
+                        if not paths:
+                            del self._postings[gram]
+            for gram in _trigrams(added):
+                if not counts[gram]:
+                    self._postings[gram].add(path)
+                counts[gram] += 1
+            self._docs[path] = (new_value, counts)
+
+    def remove(self, path: str) -> None:
+        with self._lock:
+            self._remove(path)
+
+    def _sync(self, files: Mapping, load: Callable[[object], str]) -> None:
+        for path in [path for path in self._docs if path not in files]:
+            self._remove(path)
+        for path, value in files.items():
+            entry = self._docs.get(path)
+            if entry is None or not same_value(entry[0], value):
+                self._update(path, value, load(value))
+
+    def search(
+        self, files: Mapping, load: Callable[[object], str], literals: list[str]
+    ) -> Optional[set[str]]:
+        """Return the paths of ``files`` that may contain every literal.
+
+        Returns ``None`` for "all paths". The index is first brought in line with
+        ``files`` (``load`` turns a stored value into text), reindexing only
+        changed paths; both happen under the lock, so a concurrent call with
+        other ``files`` cannot change the index in between.
+        """
+        grams = set()
+        for literal in literals:
+            grams.update(_trigrams(literal))
+        if not grams:
+            return None
+        with self._lock:
+            self._sync(files, load)
+            result = None
+            for gram in sorted(grams, key=lambda g: len(self._postings.get(g, ()))):
+                paths = self._postings.get(gram)
+                if not paths:
+                    return set()
+                result = set(paths) if result is None else result & paths
+                if not result:
+                    break
+            return result
+
+
+_indexes: "OrderedDict[object, TrigramIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(key) -> TrigramIndex:
+    """Return the index for ``key`` (see ``deepagents.vfs.current_scope``)."""
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = TrigramIndex()
+            while len(_indexes) > _MAX_INDEXES:
+                _indexes.popitem(last=False)
+        _indexes.move_to_end(key)
+        return index
+
+
+def compile_pattern(pattern: str, ignore_case: bool = False) -> re.Pattern:
+    return re.compile(pattern, re.MULTILINE | (re.IGNORECASE if ignore_case else 0))
@@ -0,0 +1,52 @@
+"""Registration of the ``files`` value types with LangGraph's checkpoint serializer.
+
+Checkpoints store ``FileMap`` and the content types it can hold through
+LangGraph's msgpack serializer, which only rebuilds the types it knows about:
+others are loaded with a warning, or not at all when
+``LANGGRAPH_STRICT_MSGPACK=true``. Importing ``deepagents`` registers them.
+
+The serializer stores an object with an ``_asdict`` method as its class and the
+keyword arguments ``_asdict`` returns, and rebuilds it as ``cls(**kwargs)``.
+``FileMap`` uses it to be stored as a plain dict, the text types of
+``AsText`` as their flat text.
+"""
+
+try:
+    from langgraph.checkpoint.serde import _msgpack
+except ImportError:  # releases without an allowlist rebuild every type
+    _msgpack = None
+
+ALLOWED_MSGPACK_TYPES = frozenset(
+    {
+        ("deepagents.filemap", "FileMap"),
+        ("deepagents.piece_table", "PieceTable"),
+        ("deepagents.chunked_text", "ChunkedText"),
+        ("deepagents.compression", "CompressedText"),
+        ("deepagents.blobs", "BlobRef"),
+        ("deepagents.merge", "FileMerge"),
+    }
+)
+
+
+class AsText:
+    """Mixin for immutable text types checkpointed and pickled as their flat text.
+
+    The class must take the text as its first argument, ``text``.
+    """
+
+    __slots__ = ()
+
+    def __reduce__(self):
+        return (type(self), (str(self),))
+
+    def _asdict(self) -> dict:
+        return {"text": str(self)}
+
+
+def register_msgpack_types() -> None:
+    """Add ``ALLOWED_MSGPACK_TYPES`` to the types every serializer rebuilds."""
+    safe = getattr(_msgpack, "SAFE_MSGPACK_TYPES", None)
+    if safe is None:
+        return
+    if not ALLOWED_MSGPACK_TYPES <= safe:
+        _msgpack.SAFE_MSGPACK_TYPES = safe | ALLOWED_MSGPACK_TYPES
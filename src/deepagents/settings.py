@@ -0,0 +1,26 @@
+"""Helper behind the ``configure_*`` functions of the process-wide settings.
+
+Each area (``vfs``, ``model``, ``compaction``, ``tool_output``, ``sub_agent``)
+keeps its settings in a module-level dataclass instance, updated in place by
+its ``configure_*`` function so modules holding a reference see the change.
+"""
+
+from dataclasses import fields
+from typing import Any, TypeVar
+
+S = TypeVar("S")
+
+
+def update_settings(settings: S, kind: str, changes: dict[str, Any]) -> S:
+    """Apply ``changes`` to the ``settings`` dataclass and return it.
+
+    Raises ``TypeError`` (naming the ``kind`` of settings) if a change is not a
+    field of ``settings``; nothing is changed then.
+    """
+    names = {field.name for field in fields(settings)}
+    for name in changes:
+        if name not in names:
+            raise TypeError(f"Unknown {kind} setting: {name!r}")
+    for name, value in changes.items():
+        setattr(settings, name, value)
+    return settings
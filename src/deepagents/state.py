@@ -3,6 +3,15 @@ from typing import NotRequired, Annotated
 from typing import Literal
 from typing_extensions import TypedDict
 
+from deepagents.filemap import FileMap
+from deepagents.merge import FileMerge, apply_merge
+from deepagents.serde import register_msgpack_types
+
+try:
+    from langgraph.channels.delta import DeltaChannel
+except ImportError:  # langgraph releases without delta channels
+    DeltaChannel = None
+
 
 class Todo(TypedDict):
     """Todo to track."""
@@ -11,15 +20,55 @@ class Todo(TypedDict):
     status: Literal["pending", "in_progress", "completed"]
 
 
+class FileEdit(TypedDict):
+    """One replacement of a ``multi_edit`` call."""
+
+    old_string: str
+    new_string: str
+    replace_all: NotRequired[bool]
+
+
+register_msgpack_types()
+
+# Value used in a ``files`` update to delete that path.
+TOMBSTONE = None
+
+
 def file_reducer(l, r):
-    if l is None:
-        return r
-    elif r is None:
+    """Apply a ``files`` update.
+
+    ``r`` is either a full ``FileMap`` (merged structurally) or a delta mapping of
+    only the touched paths, where ``TOMBSTONE`` deletes the path and a
+    ``FileMerge`` is merged with the current content (see ``deepagents.merge``).
+    """
+    if r is None:
         return l
-    else:
-        return {**l, **r}
+    if not isinstance(l, FileMap):
+        l = FileMap(l)
+    if isinstance(r, FileMap):
+        return l.update(r)
+    for path, content in r.items():
+        if isinstance(content, FileMerge):
+            content = apply_merge(path, l.get(path), content)
+        if content is TOMBSTONE:
+            l = l.delete(path)
+        else:
+            l = l.set(path, content)
+    return l
+
+
+def apply_file_updates(files, updates):
+    """Apply a batch of ``files`` updates in order (the ``DeltaChannel`` reducer)."""
+    for update in updates:
+        files = file_reducer(files, update)
+    return files
+
+
+# Checkpoints store only each step's ``files`` updates when langgraph supports
+# it, instead of the whole map at every step
+_files_channel = file_reducer if DeltaChannel is None else DeltaChannel(apply_file_updates)
 
 
 class DeepAgentState(AgentState):
     todos: NotRequired[list[Todo]]
-    files: Annotated[NotRequired[dict[str, str]], file_reducer]
+    files: Annotated[NotRequired[FileMap], _files_channel]
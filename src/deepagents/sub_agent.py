@@ -1,49 +1,556 @@
-from deepagents.prompts import TASK_DESCRIPTION_PREFIX, TASK_DESCRIPTION_SUFFIX
+from deepagents.prompts import (
+    TASK_DESCRIPTION_PREFIX,
+    TASK_DESCRIPTION_SUFFIX,
+    TASK_BATCH_DESCRIPTION,
+)
 from deepagents.state import DeepAgentState
+from deepagents.filemap import FileMap
+from deepagents.path_index import glob_prefix
+from deepagents.state import TOMBSTONE
+from deepagents.blobs import BlobRef
+from deepagents.cache import ResultCache
+from deepagents.vfs import decode_content, encode_content
+from deepagents.compaction import compaction_hook, settings as compaction_settings
+from deepagents.merge import FileConflict, FileMerge, newer, reconcile
+from deepagents.settings import update_settings
+from deepagents.tool_utils import as_tool
 from langgraph.prebuilt import create_react_agent
-from langchain_core.tools import BaseTool
-from typing import TypedDict
-from langchain_core.tools import tool, InjectedToolCallId
+from langchain_core.tools import BaseTool, StructuredTool
+from typing import Any, Callable, Iterator, Optional
+from typing_extensions import TypedDict
+from langchain_core.tools import InjectedToolCallId
 from langchain_core.messages import ToolMessage
+from langchain_core.runnables.config import ContextThreadPoolExecutor
 from typing import Annotated, NotRequired
 from langgraph.types import Command
+from langgraph.config import get_stream_writer
 
 from langgraph.prebuilt import InjectedState
 
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from fnmatch import fnmatch
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+
 
 class SubAgent(TypedDict):
     name: str
     description: str
     prompt: str
     tools: NotRequired[list[str]]
+    # Handoff policy: globs of the parent's files the sub agent can see (all by default)
+    files: NotRequired[list[str]]
+    # Whether the parent's todo list is passed to the sub agent (True by default)
+    share_todos: NotRequired[bool]
+    # Globs of the files whose changes are merged back into the parent (all by default)
+    output_files: NotRequired[list[str]]
+    # Budgets: wall-clock seconds, graph node runs and model calls the sub agent may
+    # use. When one runs out the sub agent is stopped and returns its partial result
+    deadline: NotRequired[float]
+    max_steps: NotRequired[int]
+    max_model_calls: NotRequired[int]
+    # Whether the sub agent's model output is forwarded token by token to the
+    # parent's ``custom`` stream (False by default: it costs a callback per token)
+    stream_tokens: NotRequired[bool]
+
+
+class TaskItem(TypedDict):
+    """One sub agent run of a ``task_batch`` call."""
+
+    description: str
+    subagent_type: str
+
+
+@dataclass
+class SubAgentSettings:
+    """Process-wide settings for running sub agents.
+
+    Attributes:
+        max_concurrency: Maximum number of sub agents running at once. Sync runs
+            share one limit for the process, async runs one limit per event loop.
+            ``None`` (the default) means no limit.
+        max_batch_concurrency: Maximum number of sub agents one ``task_batch``
+            call runs at once.
+        result_cache: When set, sub agent results are memoized in this cache
+            (see ``deepagents.cache``), keyed on the sub agent and its model, its
+            normalized task description and the files and todos it is given. A
+            hit returns the cached final message and file changes without
+            running the sub agent.
+    """
+
+    max_concurrency: Optional[int] = None
+    max_batch_concurrency: int = 8
+    result_cache: Optional[ResultCache] = None
+
+
+settings = SubAgentSettings()
+
+
+def configure_subagents(**changes: Any) -> SubAgentSettings:
+    """Update the process-wide ``SubAgentSettings`` and return them."""
+    return update_settings(settings, "sub agent", changes)
+
 
+_slots_lock = threading.Lock()
+_thread_slots: Optional[tuple[int, threading.Semaphore]] = None
+_loop_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple[int, asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
 
-def _create_task_tool(tools, instructions, subagents: list[SubAgent], model, state_schema):
-    agents = {
-        "general-purpose": create_react_agent(model, prompt=instructions, tools=tools)
+
+@contextmanager
+def _slot():
+    """Hold one of the ``max_concurrency`` sub agent slots of the process."""
+    global _thread_slots
+    limit = settings.max_concurrency
+    if limit is None:
+        yield
+        return
+    with _slots_lock:
+        if _thread_slots is None or _thread_slots[0] != limit:
+            _thread_slots = (limit, threading.Semaphore(limit))
+        semaphore = _thread_slots[1]
+    with semaphore:
+        yield
+
+
+@asynccontextmanager
+async def _aslot():
+    """Hold one of the ``max_concurrency`` sub agent slots of the running loop."""
+    limit = settings.max_concurrency
+    if limit is None:
+        yield
+        return
+    loop = asyncio.get_running_loop()
+    with _slots_lock:
+        entry = _loop_slots.get(loop)
+        if entry is None or entry[0] != limit:
+            entry = _loop_slots[loop] = (limit, asyncio.Semaphore(limit))
+    async with entry[1]:
+        yield
+
+
+def _select_files(files: FileMap, patterns: list[str]) -> FileMap:
+    """Return the entries of ``files`` whose path matches any of ``patterns``."""
+    index = files.path_index()
+    selected = {}
+    for pattern in patterns:
+        for path in index.iter_paths(glob_prefix(pattern)):
+            if fnmatch(path, pattern):
+                selected[path] = files[path]
+    return FileMap(selected)
+
+
+def _handoff(spec: SubAgent, state, description: str) -> tuple[dict, FileMap]:
+    """Build a sub agent's input from the parent state, without modifying it.
+
+    Returns the input and the files it was given, to diff the result against.
+    """
+    files = state.get("files") or FileMap()
+    if not isinstance(files, FileMap):
+        files = FileMap(files)
+    if "files" in spec:
+        files = _select_files(files, spec["files"])
+    sub_state = {
+        k: v for k, v in state.items() if k not in ("messages", "files", "todos")
     }
-    tools_by_name = {}
-    for tool_ in tools:
-        if not isinstance(tool_, BaseTool):
-            tool_ = tool(tool_)
-        tools_by_name[tool_.name] = tool_
+    sub_state["messages"] = [{"role": "user", "content": description}]
+    sub_state["files"] = files
+    if spec.get("share_todos", True) and "todos" in state:
+        sub_state["todos"] = state["todos"]
+    return sub_state, files
+
+
+def _merge_back(spec: SubAgent, base: FileMap, result) -> dict:
+    """Return the ``files`` delta from ``base`` to the sub agent's final files."""
+    files = result.get("files")
+    if files is None:
+        return {}
+    if not isinstance(files, FileMap):
+        files = FileMap(files)
+    delta = base.diff(files, deleted=TOMBSTONE)
+    if "output_files" in spec:
+        delta = {
+            path: value
+            for path, value in delta.items()
+            if any(fnmatch(path, pattern) for pattern in spec["output_files"])
+        }
+    return delta
+
+
+def _with_conflicts(content: str, conflicts: list[FileConflict]) -> str:
+    """Append a description of ``conflicts`` to a task result."""
+    if not conflicts:
+        return content
+    lines = [content, "", "File conflicts (these changes were not applied):"]
+    for conflict in conflicts:
+        line = f"- {conflict['path']}: {conflict['reason']}"
+        if "saved_as" in conflict:
+            line += f"; this task's version was saved to {conflict['saved_as']}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _fingerprint(value) -> str:
+    # Same digest as a ``BlobRef`` of the content, so both representations match
+    if isinstance(value, BlobRef):
+        return value.digest
+    data = decode_content(value).encode("utf-8", errors="surrogatepass")
+    return hashlib.sha256(data).hexdigest()
+
+
+def _model_identity(model) -> list:
+    """Return what identifies ``model`` (its type and parameters) in a cache key."""
+    if isinstance(model, str):
+        return [model]
+    llm_type = getattr(model, "_llm_type", None)
+    if llm_type is None:
+        # e.g. a model bound to arguments
+        return [type(model).__name__, repr(model)]
+    return [llm_type, model._identifying_params]
+
+
+def _cached_output(delta: dict) -> dict:
+    # Blob references may point to a store the process reading the cache does
+    # not have (e.g. the temporary spill store), so the text itself is cached
+    return {
+        path: value if value is None else decode_content(value)
+        for path, value in delta.items()
+    }
+
+
+def _from_cache(delta: dict) -> dict:
+    return {
+        path: value if value is None else encode_content(value)
+        for path, value in delta.items()
+    }
+
+
+def _cache_key(subagent_type: str, identity, sub_state: dict, files: FileMap) -> str:
+    """Hash everything a sub agent run depends on into a cache key."""
+    description = sub_state["messages"][0]["content"]
+    payload = [
+        subagent_type,
+        identity,
+        " ".join(description.split()).casefold(),
+        sorted((path, _fingerprint(value)) for path, value in files.items()),
+        sub_state.get("todos"),
+    ]
+    return hashlib.sha256(json.dumps(payload, default=str).encode()).hexdigest()
+
+
+class _Budget:
+    """Tracks a sub agent run against the budgets of its spec."""
+
+    def __init__(self, spec: SubAgent):
+        self.spec = spec
+        self.deadline = (
+            time.monotonic() + spec["deadline"] if "deadline" in spec else None
+        )
+        self.steps = 0
+        self.model_calls = 0
+
+    def record(self, update) -> None:
+        """Count the nodes of one ``updates`` stream chunk."""
+        if isinstance(update, dict):
+            for node in update:
+                self.steps += 1
+                if node == "agent":
+                    self.model_calls += 1
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0)
+
+    def exceeded(self) -> Optional[str]:
+        """Return the budget that ran out, if any."""
+        spec = self.spec
+        if "max_steps" in spec and self.steps >= spec["max_steps"]:
+            return f"{spec['max_steps']} steps"
+        if "max_model_calls" in spec and self.model_calls >= spec["max_model_calls"]:
+            return f"{spec['max_model_calls']} model calls"
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return f"{spec['deadline']} seconds"
+        return None
+
+
+def _finished(values: dict) -> bool:
+    last = values["messages"][-1]
+    return getattr(last, "type", None) == "ai" and not getattr(last, "tool_calls", None)
+
+
+def _outcome(values: dict, stopped: Optional[str]) -> tuple[str, dict, bool]:
+    """Return ``(final message, final state, complete)`` of a sub agent run."""
+    if stopped is None or _finished(values):
+        return values["messages"][-1].content, values, True
+    partial = next(
+        (
+            m.content
+            for m in reversed(values["messages"])
+            if getattr(m, "type", None) == "ai" and m.content
+        ),
+        "",
+    )
+    return (
+        f"Sub agent stopped early after reaching its budget of {stopped}. Partial result:\n\n{partial}",
+        values,
+        False,
+    )
+
+
+_PREVIEW_CHARS = 500
+
+
+def _emitter(namespace: str) -> Optional[Callable[[dict], None]]:
+    """Return a function forwarding progress events to the calling graph's stream.
+
+    Events go to the ``custom`` stream mode of the parent run, tagged with
+    ``namespace`` (``"<subagent_type>:<tool_call_id>"``).
+    """
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        # Not called from a graph run
+        return None
+    return lambda event: writer({"namespace": namespace, **event})
+
+
+def _progress_events(mode: str, chunk) -> Iterator[dict]:
+    """Translate one chunk of a sub agent's stream into progress events."""
+    if mode == "messages":
+        message, _ = chunk
+        if message.type == "AIMessageChunk" and isinstance(message.content, str) and message.content:
+            yield {"event": "token", "content": message.content}
+        return
+    if not isinstance(chunk, dict):
+        return
+    for node, update in chunk.items():
+        messages = update.get("messages", []) if isinstance(update, dict) else []
+        for message in messages:
+            if message.type == "ai":
+                yield {
+                    "event": "model",
+                    "node": node,
+                    "content": message.content,
+                    "tool_calls": [
+                        {"name": call["name"], "args": call["args"]}
+                        for call in message.tool_calls
+                    ],
+                }
+            elif message.type == "tool":
+                yield {
+                    "event": "tool_result",
+                    "node": node,
+                    "name": message.name,
+                    "content": str(message.content)[:_PREVIEW_CHARS],
+                }
+
+
+def _stream_modes(spec: SubAgent, emit) -> list[str]:
+    # A writer is available in any graph run, listened to or not: token
+    # streaming is only turned on when the sub agent asks for it
+    if emit and spec.get("stream_tokens", False):
+        return ["updates", "values", "messages"]
+    return ["updates", "values"]
+
+
+def _execute(graph, sub_state: dict, spec: SubAgent, emit=None) -> tuple[str, dict, bool]:
+    """Run a sub agent, stopping it between steps once a budget runs out.
+
+    Progress is passed to ``emit`` as it happens.
+    """
+    budget = _Budget(spec)
+    values, stopped = sub_state, None
+    for mode, chunk in graph.stream(sub_state, stream_mode=_stream_modes(spec, emit)):
+        if mode == "values":
+            values = chunk
+            stopped = budget.exceeded()
+            if stopped:
+                break
+            continue
+        if mode == "updates":
+            budget.record(chunk)
+        if emit:
+            for event in _progress_events(mode, chunk):
+                emit(event)
+    return _outcome(values, stopped)
+
+
+async def _aexecute(graph, sub_state: dict, spec: SubAgent, emit=None) -> tuple[str, dict, bool]:
+    """Async ``_execute``; the deadline also interrupts a step in progress."""
+    budget = _Budget(spec)
+    values, stopped = sub_state, None
+    stream = graph.astream(sub_state, stream_mode=_stream_modes(spec, emit))
+    try:
+        while True:
+            try:
+                mode, chunk = await asyncio.wait_for(anext(stream), budget.remaining())
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError:
+                stopped = f"{spec['deadline']} seconds"
+                break
+            if mode == "values":
+                values = chunk
+                stopped = budget.exceeded()
+                if stopped:
+                    break
+                continue
+            if mode == "updates":
+                budget.record(chunk)
+            if emit:
+                for event in _progress_events(mode, chunk):
+                    emit(event)
+    finally:
+        await stream.aclose()
+    return _outcome(values, stopped)
+
+
+_MAX_COMPILED = 64
+_compiled: "OrderedDict[tuple, tuple]" = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+def _compiled_agent(model, prompt: str, tools: list[BaseTool], state_schema):
+    """Return the ReAct graph for this configuration, compiling it on first use.
+
+    Graphs are shared by every deep agent built with the same model object,
+    prompt, tool objects and state schema.
+    """
+    model_key = model if isinstance(model, str) else id(model)
+    compact = compaction_settings.max_tokens is not None
+    key = (model_key, prompt, tuple(id(t) for t in tools), state_schema, compact)
+    with _compiled_lock:
+        entry = _compiled.get(key)
+        if entry is not None:
+            _compiled.move_to_end(key)
+            return entry[1]
+    graph = create_react_agent(
+        model,
+        prompt=prompt,
+        tools=tools,
+        state_schema=state_schema,
+        pre_model_hook=compaction_hook(model) if compact else None,
+    )
+    with _compiled_lock:
+        # The entry keeps ``model`` and ``tools`` alive so their ids are not reused
+        graph = _compiled.setdefault(key, ((model, tools), graph))[1]
+        _compiled.move_to_end(key)
+        while len(_compiled) > _MAX_COMPILED:
+            _compiled.popitem(last=False)
+    return graph
+
+
+def _create_task_tools(tools, instructions, subagents: list[SubAgent], model, state_schema):
+    """Return the ``task`` and ``task_batch`` tools for the given sub agents.
+
+    Sub agent graphs are only compiled when a sub agent is first called.
+    """
+    tools = [as_tool(t) for t in tools]
+    tools_by_name = {t.name: t for t in tools}
+    # name -> (prompt, tools) of each sub agent
+    agents = {"general-purpose": (instructions, tools)}
+    specs = {"general-purpose": {}}
     for _agent in subagents:
         if "tools" in _agent:
             _tools = [tools_by_name[t] for t in _agent["tools"]]
         else:
             _tools = tools
-        agents[_agent["name"]] = create_react_agent(
-            model, prompt=_agent["prompt"], tools=_tools, state_schema=state_schema
-        )
+        agents[_agent["name"]] = (_agent["prompt"], _tools)
+        specs[_agent["name"]] = _agent
+    # What, besides its input, a sub agent's result depends on
+    model_identity = _model_identity(model)
+    identities = {
+        name: (model_identity, prompt, sorted(t.name for t in agent_tools))
+        for name, (prompt, agent_tools) in agents.items()
+    }
+
+    def _graph(subagent_type: str):
+        prompt, agent_tools = agents[subagent_type]
+        return _compiled_agent(model, prompt, agent_tools, state_schema)
 
     other_agents_string = [
         f"- {_agent['name']}: {_agent['description']}" for _agent in subagents
     ]
 
-    @tool(
-        description=TASK_DESCRIPTION_PREFIX.format(other_agents=other_agents_string)
-        + TASK_DESCRIPTION_SUFFIX
-    )
+    def _unknown(subagent_type: str) -> str:
+        return f"Error: invoked agent of type {subagent_type}, the only allowed types are {[f'`{k}`' for k in agents]}"
+
+    def _cached(subagent_type: str, sub_state: dict, base: FileMap):
+        cache = settings.result_cache
+        if cache is None:
+            return None, None
+        key = _cache_key(subagent_type, identities[subagent_type], sub_state, base)
+        return cache, key
+
+    def _run(
+        subagent_type: str, state, description: str, namespace: str
+    ) -> tuple[str, dict, list[FileConflict]]:
+        spec = specs[subagent_type]
+        sub_state, base = _handoff(spec, state, description)
+        cache, key = _cached(subagent_type, sub_state, base)
+        emit = _emitter(namespace)
+        if emit:
+            emit({"event": "start", "subagent_type": subagent_type, "description": description})
+        if cache is not None:
+            output = cache.get(key)
+            if output is not None:
+                if emit:
+                    emit({"event": "end", "complete": True, "cached": True})
+                return (output[0], *reconcile(state.get("files"), base, _from_cache(output[1])))
+        with _slot():
+            content, result, complete = _execute(_graph(subagent_type), sub_state, spec, emit)
+        if emit:
+            emit({"event": "end", "complete": complete, "cached": False})
+        delta = _merge_back(spec, base, result)
+        if cache is not None and complete:
+            cache.put(key, (content, _cached_output(delta)))
+        return (content, *reconcile(state.get("files"), base, delta))
+
+    async def _arun(
+        subagent_type: str, state, description: str, namespace: str
+    ) -> tuple[str, dict, list[FileConflict]]:
+        spec = specs[subagent_type]
+        sub_state, base = _handoff(spec, state, description)
+        cache, key = _cached(subagent_type, sub_state, base)
+        emit = _emitter(namespace)
+        if emit:
+            emit({"event": "start", "subagent_type": subagent_type, "description": description})
+        if cache is not None:
+            output = cache.get(key)
+            if output is not None:
+                if emit:
+                    emit({"event": "end", "complete": True, "cached": True})
+                return (output[0], *reconcile(state.get("files"), base, _from_cache(output[1])))
+        # Parallel ``task`` calls of one message overlap on the event loop
+        async with _aslot():
+            content, result, complete = await _aexecute(
+                _graph(subagent_type), sub_state, spec, emit
+            )
+        if emit:
+            emit({"event": "end", "complete": complete, "cached": False})
+        delta = _merge_back(spec, base, result)
+        if cache is not None and complete:
+            cache.put(key, (content, _cached_output(delta)))
+        return (content, *reconcile(state.get("files"), base, delta))
+
+    def _command(
+        content: str, files: dict, conflicts: list[FileConflict], tool_call_id: str
+    ) -> Command:
+        # Conflicts are attached as the message's artifact for programmatic use
+        message = ToolMessage(content, tool_call_id=tool_call_id, artifact=conflicts or None)
+        update = {"messages": [message]}
+        if files:
+            update["files"] = files
+        return Command(update=update)
+
     def task(
         description: str,
         subagent_type: str,
@@ -51,19 +558,110 @@ def _create_task_tool(tools, instructions, subagents: list[SubAgent], model, sta
         tool_call_id: Annotated[str, InjectedToolCallId],
     ):
         if subagent_type not in agents:
-            return f"Error: invoked agent of type {subagent_type}, the only allowed types are {[f'`{k}`' for k in agents]}"
-        sub_agent = agents[subagent_type]
-        state["messages"] = [{"role": "user", "content": description}]
-        result = sub_agent.invoke(state)
-        return Command(
-            update={
-                "files": result.get("files", {}),
-                "messages": [
-                    ToolMessage(
-                        result["messages"][-1].content, tool_call_id=tool_call_id
-                    )
-                ],
-            }
+            return _unknown(subagent_type)
+        content, files, conflicts = _run(
+            subagent_type, state, description, f"{subagent_type}:{tool_call_id}"
+        )
+        return _command(_with_conflicts(content, conflicts), files, conflicts, tool_call_id)
+
+    async def atask(
+        description: str,
+        subagent_type: str,
+        state: Annotated[DeepAgentState, InjectedState],
+        tool_call_id: Annotated[str, InjectedToolCallId],
+    ):
+        if subagent_type not in agents:
+            return _unknown(subagent_type)
+        content, files, conflicts = await _arun(
+            subagent_type, state, description, f"{subagent_type}:{tool_call_id}"
         )
+        return _command(_with_conflicts(content, conflicts), files, conflicts, tool_call_id)
+
+    def _batch_error(tasks: list[TaskItem]) -> Optional[str]:
+        if not tasks:
+            return "Error: No tasks provided"
+        for item in tasks:
+            if item["subagent_type"] not in agents:
+                return _unknown(item["subagent_type"])
+        return None
 
-    return task
+    def _batch_args(item: TaskItem, state, tool_call_id: str, index: int) -> tuple:
+        subagent_type = item["subagent_type"]
+        namespace = f"{subagent_type}:{tool_call_id}:{index}"
+        return subagent_type, state, item["description"], namespace
+
+    def _batch_command(tasks: list[TaskItem], results: list, tool_call_id: str) -> Command:
+        # One combined message; for a path changed by several tasks the newest
+        # merged version contains the others
+        files = {}
+        all_conflicts = []
+        sections = []
+        for number, (item, result) in enumerate(zip(tasks, results), 1):
+            if isinstance(result, BaseException):
+                content = f"Error: {result!r}"
+            else:
+                content, delta, conflicts = result
+                for path, entry in delta.items():
+                    previous = files.get(path)
+                    if isinstance(previous, FileMerge) and isinstance(entry, FileMerge):
+                        entry = newer(entry, previous)
+                    files[path] = entry
+                content = _with_conflicts(content, conflicts)
+                all_conflicts.extend(conflicts)
+            sections.append(f"## Task {number} ({item['subagent_type']})\n\n{content}")
+        return _command("\n\n".join(sections), files, all_conflicts, tool_call_id)
+
+    def task_batch(
+        tasks: list[TaskItem],
+        state: Annotated[DeepAgentState, InjectedState],
+        tool_call_id: Annotated[str, InjectedToolCallId],
+    ):
+        error = _batch_error(tasks)
+        if error:
+            return error
+
+        def run(index: int, item: TaskItem):
+            try:
+                return _run(*_batch_args(item, state, tool_call_id, index))
+            except Exception as e:
+                return e
+
+        workers = min(settings.max_batch_concurrency, len(tasks))
+        with ContextThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run, range(len(tasks)), tasks))
+        return _batch_command(tasks, results, tool_call_id)
+
+    async def atask_batch(
+        tasks: list[TaskItem],
+        state: Annotated[DeepAgentState, InjectedState],
+        tool_call_id: Annotated[str, InjectedToolCallId],
+    ):
+        error = _batch_error(tasks)
+        if error:
+            return error
+        semaphore = asyncio.Semaphore(settings.max_batch_concurrency)
+
+        async def run(index: int, item: TaskItem):
+            async with semaphore:
+                return await _arun(*_batch_args(item, state, tool_call_id, index))
+
+        results = await asyncio.gather(
+            *map(run, range(len(tasks)), tasks), return_exceptions=True
+        )
+        return _batch_command(tasks, results, tool_call_id)
+
+    return [
+        StructuredTool.from_function(
+            func=task,
+            coroutine=atask,
+            name="task",
+            description=TASK_DESCRIPTION_PREFIX.format(other_agents=other_agents_string)
+            + TASK_DESCRIPTION_SUFFIX,
+        ),
+        StructuredTool.from_function(
+            func=task_batch,
+            coroutine=atask_batch,
+            name="task_batch",
+            description=TASK_BATCH_DESCRIPTION,
+        ),
+    ]
@@ -0,0 +1,191 @@
+"""Moving oversized tool outputs out of the message history.
+
+With ``configure_tool_outputs(max_chars=...)``, ``create_deep_agent`` wraps the
+tools it is given so that an output longer than ``max_chars`` is written to a
+file of the virtual file system instead of going to the model whole. The tool
+message then holds a preview and the file's path, and the agent can
+``read_file`` or ``grep`` the parts it needs.
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForToolRun,
+    CallbackManagerForToolRun,
+)
+from langchain_core.messages import BaseMessage, ToolMessage
+from langchain_core.tools import BaseTool
+from langgraph.types import Command
+
+from deepagents.cache import WrapperCache
+from deepagents.line_index import MAX_LINE_CHARS
+from deepagents.settings import update_settings
+from deepagents.tool_utils import as_tool
+from deepagents.vfs import encode_content
+
+
+@dataclass
+class ToolOutputSettings:
+    """Process-wide settings for oversized tool outputs.
+
+    Attributes:
+        max_chars: Outputs longer than this are moved to a file. ``None`` (the
+            default) leaves outputs as they are.
+        preview_chars: Length of the beginning of the output kept in the
+            message.
+        output_dir: Directory of the files the outputs are moved to. It is not
+            the one compaction saves tool results to, so compacting the message
+            of a moved output never replaces its file.
+    """
+
+    max_chars: Optional[int] = None
+    preview_chars: int = 2000
+    output_dir: str = "tool_outputs/full"
+
+
+settings = ToolOutputSettings()
+
+
+def configure_tool_outputs(**changes: Any) -> ToolOutputSettings:
+    """Update the process-wide ``ToolOutputSettings`` and return them.
+
+    Only agents created while ``max_chars`` is set wrap their tools.
+
+    Example:
+        configure_tool_outputs(max_chars=20_000)
+    """
+    return update_settings(settings, "tool output", changes)
+
+
+def _readable(content: str) -> str:
+    # JSON results (e.g. search APIs) come on one line; indent them so that
+    # ``read_file`` can page through them
+    if content[:1] in ("{", "["):
+        try:
+            content = json.dumps(json.loads(content), indent=2, ensure_ascii=False)
+        except ValueError:
+            pass
+    # Long values (e.g. a fetched page in one JSON string) still make long lines,
+    # whose end ``read_file`` and ``grep`` would cut: split them
+    if not any(len(line) > MAX_LINE_CHARS for line in content.splitlines()):
+        return content
+    lines = []
+    for line in content.splitlines(keepends=True):
+        text = line.splitlines()[0]
+        chunks = [text[i : i + MAX_LINE_CHARS] for i in range(0, len(text), MAX_LINE_CHARS)]
+        lines.append("\n".join(chunks) + line[len(text) :])
+    return "".join(lines)
+
+
+def output_path(directory: str, name: Optional[str], tool_call_id: str) -> str:
+    """Return the file in ``directory`` for the output of a tool call.
+
+    Used for outputs moved here and for tool results compacted out of the
+    history (see ``deepagents.compaction``), each with its own directory.
+    """
+    return f"{directory}/{name or 'tool'}-{tool_call_id}.txt"
+
+
+_NOTE = "\n\n[Output truncated: "
+
+
+def is_spilled(message: BaseMessage) -> bool:
+    """Return whether ``message`` is a tool result whose output was moved to a file."""
+    return (
+        isinstance(message, ToolMessage)
+        and isinstance(message.content, str)
+        and _NOTE in message.content
+        and message.content.endswith("to see the parts you need.]")
+    )
+
+
+def _spill(result):
+    """Return ``result`` with its content moved to a file if it is too long."""
+    if (
+        not isinstance(result, ToolMessage)
+        or not isinstance(result.content, str)
+        or settings.max_chars is None
+        or len(result.content) <= settings.max_chars
+    ):
+        return result
+    path = output_path(settings.output_dir, result.name, result.tool_call_id)
+    content = _readable(result.content)
+    stored = encode_content(content)
+    preview = result.content[: settings.preview_chars]
+    message = result.model_copy(
+        update={
+            "content": f"{preview}{_NOTE}it has {len(result.content)} "
+            f"characters. The full output is in the file {path}; use read_file or grep "
+            "to see the parts you need.]"
+        }
+    )
+    return Command(update={"files": {path: stored}, "messages": [message]})
+
+
+class SpillingTool(BaseTool):
+    """``tool``, with outputs longer than ``settings.max_chars`` moved to a file.
+
+    Outputs are only moved when the tool is called with a tool call (as agents
+    do), since the file is added through a state update.
+    """
+
+    tool: BaseTool
+
+    def __init__(self, tool: BaseTool):
+        super().__init__(
+            tool=tool,
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            return_direct=tool.return_direct,
+            response_format=tool.response_format,
+            tags=tool.tags,
+            metadata=tool.metadata,
+        )
+
+    def _run(
+        self,
+        *args: Any,
+        run_manager: Optional[CallbackManagerForToolRun] = None,
+        **kwargs: Any,
+    ) -> Any:
+        # Reached through ``run``: the wrapped tool parses the arguments again and
+        # runs as a child of this run
+        return self.tool.run(
+            args[0] if args else kwargs,
+            callbacks=run_manager.get_child() if run_manager else None,
+        )
+
+    async def _arun(
+        self,
+        *args: Any,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+        **kwargs: Any,
+    ) -> Any:
+        return await self.tool.arun(
+            args[0] if args else kwargs,
+            callbacks=run_manager.get_child() if run_manager else None,
+        )
+
+    def invoke(self, input, config=None, **kwargs: Any) -> Any:
+        return _spill(self.tool.invoke(input, config, **kwargs))
+
+    async def ainvoke(self, input, config=None, **kwargs: Any) -> Any:
+        return _spill(await self.tool.ainvoke(input, config, **kwargs))
+
+
+_wrapped: "WrapperCache[SpillingTool]" = WrapperCache()
+
+
+def spill_large_outputs(tool_):
+    """Return ``tool_`` wrapped in a ``SpillingTool``, reusing the wrapper of a tool."""
+    if not isinstance(tool_, BaseTool):
+        if not callable(tool_):
+            # e.g. a provider's built-in tool given as a dict
+            return tool_
+        tool_ = as_tool(tool_)
+    return _wrapped.get(
+        tool_, lambda: SpillingTool(tool_), lambda wrapper: wrapper.tool is tool_
+    )
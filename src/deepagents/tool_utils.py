@@ -0,0 +1,25 @@
+"""Helpers shared by the code that wraps or runs the tools given to an agent."""
+
+import threading
+import weakref
+from typing import Any
+
+from langchain_core.tools import BaseTool, tool
+
+_wrapped: "weakref.WeakKeyDictionary[Any, BaseTool]" = weakref.WeakKeyDictionary()
+_wrapped_lock = threading.Lock()
+
+
+def as_tool(tool_) -> BaseTool:
+    """Return ``tool_`` as a ``BaseTool``, wrapping each plain function only once."""
+    if isinstance(tool_, BaseTool):
+        return tool_
+    try:
+        with _wrapped_lock:
+            wrapped = _wrapped.get(tool_)
+            if wrapped is None:
+                wrapped = _wrapped[tool_] = tool(tool_)
+        return wrapped
+    except TypeError:
+        # Not weakly referenceable; wrap it every time
+        return tool(tool_)
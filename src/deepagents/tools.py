@@ -1,16 +1,41 @@
 from langchain_core.tools import tool, InjectedToolCallId
 from langgraph.types import Command
 from langchain_core.messages import ToolMessage
-from typing import Annotated
+import re
+from bisect import bisect_right
+from fnmatch import fnmatch
+from typing import Annotated, Optional
 from langgraph.prebuilt import InjectedState
-from pathlib import Path
 
 from deepagents.prompts import (
     WRITE_TODOS_DESCRIPTION,
     EDIT_DESCRIPTION,
     TOOL_DESCRIPTION,
+    GREP_DESCRIPTION,
+    LS_DESCRIPTION,
+    MULTI_EDIT_DESCRIPTION,
+    APPEND_DESCRIPTION,
 )
-from deepagents.state import Todo, DeepAgentState
+from deepagents.state import Todo, FileEdit, DeepAgentState
+from deepagents.filemap import FileMap
+from deepagents.path_index import glob_prefix
+from deepagents.vfs import (
+    encode_content,
+    decode_content,
+    append_content,
+    tail_text,
+    editable_content,
+    splice_content,
+    splice_many,
+    find_all,
+    text_range,
+    current_scope,
+)
+from deepagents.persist import mirror_append, mirror_file, resolve_disk_path
+from deepagents.line_index import MAX_LINE_CHARS, cached_line_index, invalidate_line_index
+from deepagents.disk_file import open_disk_file
+from deepagents.search_index import compile_pattern, get_search_index, required_literals
+from deepagents.quota import page_in, spill_cold_files, touch_file
 
 
 @tool(description=WRITE_TODOS_DESCRIPTION)
@@ -27,65 +52,98 @@ def write_todos(
     )
 
 
-def ls(state: Annotated[DeepAgentState, InjectedState]) -> list[str]:
-    """List all files"""
-    return list(state.get("files", {}).keys())
+@tool(description=LS_DESCRIPTION)
+def ls(
+    state: Annotated[DeepAgentState, InjectedState],
+    path: Optional[str] = None,
+    pattern: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 500,
+) -> list[str] | str:
+    """List files"""
+    if limit < 1:
+        return f"Error: limit must be at least 1, got {limit}"
+    files = state.get("files", {})
+    if not isinstance(files, FileMap):
+        files = FileMap(files)
+    # Walk only the subtree that can match, starting after the cursor
+    prefix = path or ""
+    if pattern:
+        literal = glob_prefix(pattern)
+        if not prefix or literal.startswith(prefix.rstrip("/") + "/"):
+            prefix = literal
+    result = []
+    for file_path in files.path_index().iter_paths(prefix, cursor):
+        if pattern and not fnmatch(file_path, pattern):
+            continue
+        if len(result) >= limit:
+            result.append(
+                f"System reminder: More files match. Call ls again with cursor='{result[-1]}' to see them."
+            )
+            break
+        result.append(file_path)
+    return result
 
 
 @tool(description=TOOL_DESCRIPTION)
 def read_file(
     file_path: str,
     state: Annotated[DeepAgentState, InjectedState],
+    tool_call_id: Annotated[str, InjectedToolCallId],
     offset: int = 0,
     limit: int = 2000,
-) -> str:
+) -> str | Command:
     """Read file."""
     mock_filesystem = state.get("files", {})
-    content = None
+    paged_in = {}
     if file_path in mock_filesystem:
-        content = mock_filesystem[file_path]
+        scope = current_scope()
+        touch_file(scope, file_path)
+        index = cached_line_index(file_path, mock_filesystem[file_path], decode_content)
+        # A spilled file that is read is likely to be read again: bring it back
+        paged_in = page_in(scope, mock_filesystem, file_path, index.text)
     else:
-        # Fallback: try reading from disk
+        # Fallback: read the file on disk, indexing only the lines we need
         try:
-            path_obj = Path(file_path)
-            if not path_obj.is_absolute():
-                path_obj = Path.cwd() / file_path
-            if path_obj.exists():
-                content = path_obj.read_text(encoding="utf-8", errors="ignore")
-            else:
+            path_obj = resolve_disk_path(file_path)
+            if not path_obj.is_file():
                 return f"Error: File '{file_path}' not found"
+            index = open_disk_file(path_obj)
         except Exception:
             return f"Error: File '{file_path}' not found"
 
     # Handle empty file
-    if not content or content.strip() == "":
+    if index.blank:
         return "System reminder: File exists but has empty contents"
 
-    # Split content into lines
-    lines = content.splitlines()
-
     # Apply line offset and limit
     start_idx = offset
-    end_idx = min(start_idx + limit, len(lines))
+    lines = index.lines(start_idx, start_idx + limit)
 
     # Handle case where offset is beyond file length
-    if start_idx >= len(lines):
-        return f"Error: Line offset {offset} exceeds file length ({len(lines)} lines)"
+    if not lines:
+        return f"Error: Line offset {offset} exceeds file length ({len(index)} lines)"
 
     # Format output with line numbers (cat -n format)
     result_lines = []
-    for i in range(start_idx, end_idx):
-        line_content = lines[i]
-
+    for i, line_content in enumerate(lines, start_idx):
         # Truncate lines longer than 2000 characters
-        if len(line_content) > 2000:
-            line_content = line_content[:2000]
+        if len(line_content) > MAX_LINE_CHARS:
+            line_content = line_content[:MAX_LINE_CHARS]
 
         # Line numbers start at 1, so add 1 to the index
         line_number = i + 1
         result_lines.append(f"{line_number:6d}\t{line_content}")
 
-    return "\n".join(result_lines)
+    result = "\n".join(result_lines)
+    if paged_in:
+        return Command(
+            update={
+                "files": paged_in,
+                "messages": [ToolMessage(result, tool_call_id=tool_call_id)],
+            }
+        )
+    return result
 
 
 @tool(description="Write content to a file in the agent's virtual filesystem and persist it to disk when possible.")
@@ -99,20 +157,15 @@ def write_file(
 
     This updates the agent's in-memory files AND attempts to persist the file to disk.
     If the provided path is relative, it will be saved relative to the current working directory.
+    Disk writes happen in the background; see ``deepagents.persist.flush_disk_writes``.
     """
-    files = state.get("files", {})
-    files[file_path] = content
+    stored = encode_content(content)
+    invalidate_line_index(file_path)
+    files = {file_path: stored}
+    files.update(spill_cold_files(current_scope(), state.get("files"), files))
 
     # Best-effort: also persist to disk so end users can find the files
-    try:
-        path_obj = Path(file_path)
-        if not path_obj.is_absolute():
-            path_obj = Path.cwd() / file_path
-        path_obj.parent.mkdir(parents=True, exist_ok=True)
-        path_obj.write_text(content, encoding="utf-8")
-    except Exception:
-        # Do not fail the tool on disk write errors; still keep in-memory state
-        pass
+    mirror_file(file_path, content)
     return Command(
         update={
             "files": files,
@@ -123,6 +176,43 @@ def write_file(
     )
 
 
+@tool(description=APPEND_DESCRIPTION)
+def append_file(
+    file_path: str,
+    content: str,
+    state: Annotated[DeepAgentState, InjectedState],
+    tool_call_id: Annotated[str, InjectedToolCallId],
+) -> Command:
+    """Append to a file."""
+    old_stored = state.get("files", {}).get(file_path)
+    # Links ``content`` onto the existing chunks: nothing is copied or rescanned
+    stored = append_content(old_stored, content)
+    invalidate_line_index(file_path)
+    scope = current_scope()
+    if old_stored is not None and scope is not None:
+        # Only trigrams that end inside the appended text are new
+        before = tail_text(old_stored, 2)
+        get_search_index(scope).apply_edit(
+            file_path, old_stored, stored, before, before + content
+        )
+    files = {file_path: stored}
+    files.update(spill_cold_files(scope, state.get("files"), files))
+
+    # Best-effort: append to the mirrored file on disk as well
+    mirror_append(file_path, old_stored, stored, content)
+    return Command(
+        update={
+            "files": files,
+            "messages": [
+                ToolMessage(
+                    f"Appended {len(content)} characters to {file_path}",
+                    tool_call_id=tool_call_id,
+                )
+            ],
+        }
+    )
+
+
 @tool(description=EDIT_DESCRIPTION)
 def edit_file(
     file_path: str,
@@ -138,48 +228,187 @@ def edit_file(
     if file_path not in mock_filesystem:
         return f"Error: File '{file_path}' not found"
 
-    # Get current file content
-    content = mock_filesystem[file_path]
+    # Get current file content (a PieceTable for large files, if enabled)
+    old_stored = mock_filesystem[file_path]
+    content = editable_content(old_stored)
 
     # Check if old_string exists in the file
-    if old_string not in content:
+    first = content.find(old_string)
+    if first == -1:
         return f"Error: String not found in file: '{old_string}'"
 
-    # If not replace_all, check for uniqueness
-    if not replace_all:
-        occurrences = content.count(old_string)
-        if occurrences > 1:
-            return f"Error: String '{old_string}' appears {occurrences} times in file. Use replace_all=True to replace all instances, or provide a more specific string with surrounding context."
-        elif occurrences == 0:
-            return f"Error: String not found in file: '{old_string}'"
-
     # Perform the replacement
     if replace_all:
-        new_content = content.replace(old_string, new_string)
         replacement_count = content.count(old_string)
+        new_content = content.replace(old_string, new_string)
         result_msg = f"Successfully replaced {replacement_count} instance(s) of the string in '{file_path}'"
     else:
-        new_content = content.replace(
-            old_string, new_string, 1
+        # Check for uniqueness; only count every occurrence if there is a second one
+        if content.find(old_string, first + len(old_string)) != -1:
+            occurrences = content.count(old_string)
+            if occurrences > 1:
+                return f"Error: String '{old_string}' appears {occurrences} times in file. Use replace_all=True to replace all instances, or provide a more specific string with surrounding context."
+        new_content = splice_content(
+            content, first, first + len(old_string), new_string
         )  # Replace only first occurrence
         result_msg = f"Successfully replaced string in '{file_path}'"
 
-    # Update the mock filesystem
-    mock_filesystem[file_path] = new_content
+    stored = encode_content(new_content)
+    invalidate_line_index(file_path)
+    scope = current_scope()
+    if not replace_all and scope is not None:
+        # Only the trigrams around the replaced range change
+        get_search_index(scope).apply_edit(
+            file_path,
+            old_stored,
+            stored,
+            text_range(content, first - 2, first + len(old_string) + 2),
+            text_range(new_content, first - 2, first + len(new_string) + 2),
+        )
+    files = {file_path: stored}
+    files.update(spill_cold_files(scope, mock_filesystem, files))
     # Best-effort: persist to disk as well
-    try:
-        path_obj = Path(file_path)
-        if not path_obj.is_absolute():
-            path_obj = Path.cwd() / file_path
-        path_obj.parent.mkdir(parents=True, exist_ok=True)
-        path_obj.write_text(new_content, encoding="utf-8")
-    except Exception:
-        pass
+    mirror_file(file_path, new_content)
     return Command(
         update={
-            "files": mock_filesystem,
+            "files": files,
             "messages": [
                 ToolMessage(f"Updated file {file_path}", tool_call_id=tool_call_id)
             ],
         }
     )
+
+
+@tool(description=MULTI_EDIT_DESCRIPTION)
+def multi_edit(
+    file_path: str,
+    edits: list[FileEdit],
+    state: Annotated[DeepAgentState, InjectedState],
+    tool_call_id: Annotated[str, InjectedToolCallId],
+) -> Command:
+    """Apply several edits to a file."""
+    mock_filesystem = state.get("files", {})
+    if file_path not in mock_filesystem:
+        return f"Error: File '{file_path}' not found"
+    if not edits:
+        return "Error: No edits provided"
+
+    old_stored = mock_filesystem[file_path]
+    content = editable_content(old_stored)
+
+    # Validate every edit against the current content before changing anything
+    ranges = []
+    for number, edit in enumerate(edits, 1):
+        old_string = edit["old_string"]
+        new_string = edit["new_string"]
+        if not old_string:
+            return f"Error: Edit {number}: old_string must not be empty"
+        if edit.get("replace_all", False):
+            positions = list(find_all(content, old_string))
+        else:
+            positions = []
+            for found in find_all(content, old_string):
+                positions.append(found)
+                if len(positions) > 1:
+                    occurrences = content.count(old_string)
+                    return f"Error: Edit {number}: String '{old_string}' appears {occurrences} times in file. Use replace_all=True to replace all instances, or provide a more specific string with surrounding context."
+        if not positions:
+            return f"Error: Edit {number}: String not found in file: '{old_string}'"
+        ranges.extend((p, p + len(old_string), new_string, number) for p in positions)
+    ranges.sort()
+    for prev, cur in zip(ranges, ranges[1:]):
+        if cur[0] < prev[1]:
+            return f"Error: Edits {prev[3]} and {cur[3]} overlap. Combine them into a single edit."
+
+    # Apply all replacements in one pass over the content
+    new_content = splice_many(content, [(start, end, text) for start, end, text, _ in ranges])
+
+    stored = encode_content(new_content)
+    invalidate_line_index(file_path)
+    scope = current_scope()
+    search_index = get_search_index(scope) if scope is not None else None
+    previous = old_stored
+    shift = 0  # length change from the edits before the current group
+    i = 0
+    while search_index is not None and i < len(ranges):
+        # Edits closer than a trigram share their re-indexed windows
+        start, end = ranges[i][0], ranges[i][1]
+        group_shift = shift
+        while True:
+            shift += len(ranges[i][2]) - (ranges[i][1] - ranges[i][0])
+            end = ranges[i][1]
+            i += 1
+            if i == len(ranges) or ranges[i][0] - 4 >= end:
+                break
+        search_index.apply_edit(
+            file_path,
+            previous,
+            stored,
+            text_range(content, start - 2, end + 2),
+            text_range(new_content, start + group_shift - 2, end + shift + 2),
+        )
+        previous = stored
+    files = {file_path: stored}
+    files.update(spill_cold_files(scope, mock_filesystem, files))
+    # Best-effort: persist to disk as well
+    mirror_file(file_path, new_content)
+    return Command(
+        update={
+            "files": files,
+            "messages": [
+                ToolMessage(
+                    f"Updated file {file_path} ({len(ranges)} replacement(s))",
+                    tool_call_id=tool_call_id,
+                )
+            ],
+        }
+    )
+
+
+@tool(description=GREP_DESCRIPTION)
+def grep(
+    pattern: str,
+    state: Annotated[DeepAgentState, InjectedState],
+    path: Optional[str] = None,
+    ignore_case: bool = False,
+    max_results: int = 100,
+) -> str:
+    """Search file contents."""
+    try:
+        regex = compile_pattern(pattern, ignore_case)
+    except re.error as e:
+        return f"Error: Invalid regex pattern '{pattern}': {e}"
+
+    mock_filesystem = state.get("files", {})
+    # Only scan files that contain every trigram of the pattern's literal parts
+    scope = current_scope()
+    candidates = None
+    if scope is not None:
+        candidates = get_search_index(scope).search(
+            mock_filesystem, decode_content, required_literals(pattern)
+        )
+    paths = sorted(
+        p
+        for p in (mock_filesystem if candidates is None else candidates)
+        if p in mock_filesystem and (path is None or fnmatch(p, path))
+    )
+
+    result_lines = []
+    for file_path in paths:
+        index = cached_line_index(file_path, mock_filesystem[file_path], decode_content)
+        last_line = -1
+        for match in regex.finditer(index.text):
+            line = min(bisect_right(index.starts, match.start()) - 1, len(index) - 1)
+            if line <= last_line:
+                continue
+            last_line = line
+            result_lines.append(f"{file_path}:{line + 1}: {index.line(line)[:MAX_LINE_CHARS]}")
+            if len(result_lines) >= max_results:
+                result_lines.append(
+                    f"System reminder: Stopped after {max_results} matches. Narrow the pattern or `path` to see more."
+                )
+                return "\n".join(result_lines)
+
+    if not result_lines:
+        return f"No matches found for pattern '{pattern}'"
+    return "\n".join(result_lines)
@@ -0,0 +1,259 @@
+"""How file contents are stored in, and loaded from, the ``files`` channel.
+
+The file system tools never touch ``state["files"]`` values directly: they go
+through ``encode_content``/``decode_content`` so the in-state representation can
+change (e.g. to a ``BlobRef``) without the tools or callers noticing.
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+from collections.abc import Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, Optional, Union
+
+from langgraph.config import get_config
+from langgraph.constants import CONFIG_KEY_CHECKPOINTER
+
+from deepagents.blobs import BlobRef, BlobStore, LocalBlobStore
+from deepagents.chunked_text import ChunkedText
+from deepagents.compression import CompressedText, compress_text, decompress_text
+from deepagents.piece_table import PieceTable
+from deepagents.settings import update_settings
+
+
+@dataclass
+class VFSSettings:
+    """Process-wide settings for the virtual file system.
+
+    Attributes:
+        blob_store: When set, file contents of at least ``blob_min_size``
+            characters are stored in this store and the state only holds a
+            ``BlobRef``.
+        blob_min_size: Smallest content (in characters) moved to the blob store.
+        piece_table_min_size: When set, ``edit_file`` keeps files of at least this
+            many characters as a ``PieceTable`` so repeated edits do not copy the
+            whole file. Disabled by default.
+        compress_min_size: When set, contents of at least this many characters
+            that are kept in state are stored compressed with
+            ``compress_codec`` (``"zlib"`` or ``"lzma"``). Disabled by default.
+        disk_write_behind: Mirror files to disk from a background thread
+            (see ``deepagents.persist``). When ``False`` every write hits the
+            disk before the tool returns.
+        thread_quota_bytes: When set, the contents each thread keeps in state
+            are limited to about this many bytes. The least recently used files
+            beyond it are spilled to the blob store (see ``deepagents.quota``).
+        spill_dir: Where runs with a checkpointer spill files when no
+            ``blob_store`` is set. The directory is kept, like the checkpoints
+            referring to it; runs without a checkpointer spill to a temporary
+            directory removed at exit.
+    """
+
+    blob_store: Optional[BlobStore] = None
+    blob_min_size: int = 0
+    piece_table_min_size: Optional[int] = None
+    compress_min_size: Optional[int] = None
+    compress_codec: str = "zlib"
+    disk_write_behind: bool = True
+    thread_quota_bytes: Optional[int] = None
+    spill_dir: str = ".deepagents/spill"
+
+
+settings = VFSSettings()
+
+
+def configure_vfs(**changes: Any) -> VFSSettings:
+    """Update the process-wide ``VFSSettings`` and return them.
+
+    Example:
+        configure_vfs(blob_store=SQLiteBlobStore("blobs.db"), blob_min_size=1024)
+    """
+    return update_settings(settings, "VFS", changes)
+
+
+_spill_store: Optional[BlobStore] = None
+_kept_spill_store: Optional[LocalBlobStore] = None
+_spill_lock = threading.Lock()
+
+
+def _has_checkpointer() -> bool:
+    try:
+        return get_config().get("configurable", {}).get(CONFIG_KEY_CHECKPOINTER) is not None
+    except RuntimeError:
+        return False
+
+
+def _kept_store() -> LocalBlobStore:
+    global _kept_spill_store
+    with _spill_lock:
+        if _kept_spill_store is None or _kept_spill_store.root != Path(settings.spill_dir):
+            _kept_spill_store = LocalBlobStore(settings.spill_dir)
+        return _kept_spill_store
+
+
+def spill_store() -> BlobStore:
+    """Return where spilled files go: the configured ``blob_store`` if any.
+
+    Otherwise, for a run with a checkpointer, a ``LocalBlobStore`` in
+    ``settings.spill_dir``, so a thread resumed by a later process can still
+    read its spilled files. Other runs use a ``LocalBlobStore`` in a temporary
+    directory, created on first use and removed when the process exits.
+    """
+    global _spill_store
+    if settings.blob_store is not None:
+        return settings.blob_store
+    if _has_checkpointer():
+        return _kept_store()
+    with _spill_lock:
+        if _spill_store is None:
+            root = tempfile.mkdtemp(prefix="deepagents-spill-")
+            atexit.register(shutil.rmtree, root, ignore_errors=True)
+            _spill_store = LocalBlobStore(root)
+        return _spill_store
+
+
+def _store_of(ref: BlobRef) -> Optional[BlobStore]:
+    """Return the store holding ``ref``: the ``blob_store``, or a spill store."""
+    if settings.blob_store is not None:
+        return settings.blob_store
+    if _spill_store is not None and ref.digest in _spill_store:
+        return _spill_store
+    if _kept_spill_store is not None or os.path.isdir(settings.spill_dir):
+        return _kept_store()
+    return _spill_store
+
+
+def encode_content(content: str):
+    """Return the value to store in ``state["files"]`` for ``content``."""
+    if isinstance(content, (PieceTable, ChunkedText)):
+        return content
+    store = settings.blob_store
+    if store is not None and len(content) >= settings.blob_min_size:
+        return store.put(content)
+    if settings.compress_min_size is not None and len(content) >= settings.compress_min_size:
+        return compress_text(content, settings.compress_codec)
+    return content
+
+
+def decode_content(value) -> str:
+    """Return the text of a value taken from ``state["files"]``."""
+    if isinstance(value, BlobRef):
+        store = _store_of(value)
+        if store is None:
+            raise RuntimeError(
+                f"File content {value.digest} is stored as a blob but no blob store is configured"
+            )
+        return store.get(value)
+    if isinstance(value, CompressedText):
+        return decompress_text(value)
+    if isinstance(value, (PieceTable, ChunkedText)):
+        return str(value)
+    return value
+
+
+def same_value(a, b) -> bool:
+    """Return whether two values taken from ``state["files"]`` are known to hold the same text.
+
+    Text is compared by identity, so a cache checked against a rebuilt state never
+    costs a full comparison; stored references (``BlobRef``, ``CompressedText``)
+    are compared by value.
+    """
+    return a is b or (isinstance(a, tuple) and a == b)
+
+
+def editable_content(value) -> Union[str, PieceTable]:
+    """Return the content of ``value`` in the form ``edit_file`` should work on."""
+    if isinstance(value, PieceTable):
+        return value
+    text = decode_content(value)
+    min_size = settings.piece_table_min_size
+    if min_size is not None and len(text) >= min_size:
+        return PieceTable(text)
+    return text
+
+
+def append_content(value, text: str) -> ChunkedText:
+    """Return ``value`` (a stored value, or ``None`` for a new file) with ``text`` appended."""
+    if value is None:
+        return ChunkedText(text)
+    if not isinstance(value, ChunkedText):
+        value = ChunkedText(decode_content(value))
+    return value.append(text)
+
+
+def tail_text(value, n: int) -> str:
+    """Return the last ``n`` characters of a stored value."""
+    if n <= 0:
+        return ""
+    if isinstance(value, ChunkedText):
+        return value.tail(n)
+    if isinstance(value, PieceTable):
+        return value.substring(value.length - n, value.length)
+    return decode_content(value)[-n:]
+
+
+def splice_content(content: Union[str, PieceTable], start: int, end: int, text: str):
+    """Replace ``content[start:end]`` with ``text``."""
+    if isinstance(content, PieceTable):
+        return content.splice(start, end, text)
+    return content[:start] + text + content[end:]
+
+
+def find_all(content: Union[str, PieceTable], sub: str) -> Iterator[int]:
+    """Yield the non-overlapping positions of ``sub`` in ``content``, left to right."""
+    if isinstance(content, PieceTable):
+        yield from content.find_all(sub)
+        return
+    i = content.find(sub)
+    while i != -1:
+        yield i
+        i = content.find(sub, i + len(sub))
+
+
+def splice_many(content: Union[str, PieceTable], edits: list):
+    """Apply sorted, non-overlapping ``(start, end, text)`` replacements in one pass."""
+    if isinstance(content, PieceTable):
+        return content.splice_many(edits)
+    parts = []
+    pos = 0
+    for start, end, text in edits:
+        parts.append(content[pos:start])
+        parts.append(text)
+        pos = end
+    parts.append(content[pos:])
+    return "".join(parts)
+
+
+def text_range(content: Union[str, PieceTable], start: int, end: int) -> str:
+    """Return ``content[start:end]`` (clamped to the content) as a string."""
+    if isinstance(content, PieceTable):
+        return content.substring(start, end)
+    return content[max(start, 0) : end]
+
+
+def current_scope() -> Optional[tuple[str, str]]:
+    """Return a key for the ``files`` seen by the graph run calling this, or ``None``.
+
+    The key is the thread id with the checkpoint namespace of the graph, so each
+    sub agent run (a graph within a tool call) gets its own. Runs without a
+    thread id have no key: nothing tells their calls apart from those of
+    concurrent runs.
+    """
+    try:
+        configurable = get_config().get("configurable", {})
+    except RuntimeError:
+        return None
+    thread_id = configurable.get("thread_id")
+    if thread_id is None:
+        return None
+    # Tools run in a task of the graph, whose namespace ends the graph's own
+    namespace = configurable.get("checkpoint_ns", "").rpartition("|")[0]
+    return thread_id, namespace
+
+
+def materialize_files(files: Optional[Mapping]) -> dict[str, str]:
+    """Return ``files`` as a plain ``{path: text}`` dict, resolving stored content."""
+    return {path: decode_content(value) for path, value in (files or {}).items()}
@@ -0,0 +1,36 @@
+"""Chat models that answer from a script, for running agents in tests."""
+
+from typing import Callable
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class Rule(BaseChatModel):
+    """Answers with ``fn(messages)``."""
+
+    fn: Callable[[list[BaseMessage]], AIMessage]
+
+    @property
+    def _llm_type(self) -> str:
+        return "rule"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return ChatResult(generations=[ChatGeneration(message=self.fn(messages))])
+
+
+def ai(*calls: tuple[str, dict], text: str = "") -> AIMessage:
+    """Return a model message calling each ``(name, args)`` of ``calls``."""
+    tool_calls = [
+        {"name": name, "args": args, "id": f"c{i}_{name}"}
+        for i, (name, args) in enumerate(calls)
+    ]
+    return AIMessage(content=text, tool_calls=tool_calls)
+
+
+def tool_results(messages: list[BaseMessage]) -> list[str]:
+    return [m.content for m in messages if m.type == "tool"]
@@ -0,0 +1,75 @@
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import tool
+
+from deepagents.compaction import compaction_hook, settings
+from deepagents.filemap import FileMap
+from deepagents.tool_output import settings as tool_output_settings, spill_large_outputs
+from deepagents.tools import read_file
+from deepagents.vfs import decode_content
+from fakes import Rule, ai
+
+
+@tool
+def fetch(url: str) -> str:
+    """Fetch a page."""
+    return f"{url}: " + "lorem ipsum " * 1_000
+
+
+def _history(*results: ToolMessage) -> list:
+    messages = [HumanMessage("hi")]
+    for result in results:
+        call = {"name": result.name, "args": {"url": "u"}, "id": result.tool_call_id}
+        messages += [AIMessage("", tool_calls=[call]), result]
+    return messages + [AIMessage("done"), HumanMessage("next")]
+
+
+def _compact(messages, summary="summary"):
+    model = Rule(fn=lambda request: ai(text=summary))
+    return compaction_hook(model).invoke({"messages": messages})
+
+
+def test_evicted_output_round_trips_through_its_file(monkeypatch):
+    monkeypatch.setattr(settings, "max_tokens", 1_000)
+    monkeypatch.setattr(settings, "keep_recent", 2)
+    result = fetch.invoke({"name": "fetch", "args": {"url": "u"}, "id": "call1", "type": "tool_call"})
+    update = _compact(_history(result))
+
+    (message,) = update["messages"]
+    assert message.id == result.id
+    assert message.content.startswith("[Compacted to save context.")
+    assert len(message.content) < 1_000
+    (path, stored), = update["files"].items()
+    assert path == "tool_outputs/fetch-call1.txt"
+    assert path in message.content
+    assert decode_content(stored) == result.content
+
+    args = {"file_path": path, "state": {"messages": [], "files": FileMap(update["files"])}}
+    page = read_file.invoke({"name": "read_file", "args": args, "id": "r", "type": "tool_call"})
+    assert page.content.split("\t", 1)[1] == result.content[:2000]
+
+
+def test_summarized_output_keeps_its_file(monkeypatch):
+    monkeypatch.setattr(settings, "max_tokens", 1_000)
+    monkeypatch.setattr(settings, "keep_recent", 2)
+    monkeypatch.setattr(settings, "strategy", "summarize")
+    result = fetch.invoke({"name": "fetch", "args": {"url": "u"}, "id": "call1", "type": "tool_call"})
+    update = _compact(_history(result), summary="a page of lorem ipsum")
+    assert update["messages"][0].content.endswith("\n\na page of lorem ipsum")
+    assert decode_content(update["files"]["tool_outputs/fetch-call1.txt"]) == result.content
+
+
+def test_history_under_the_limit_is_left_alone(monkeypatch):
+    monkeypatch.setattr(settings, "max_tokens", 100_000)
+    result = fetch.invoke({"name": "fetch", "args": {"url": "u"}, "id": "call1", "type": "tool_call"})
+    assert _compact(_history(result)) == {}
+
+
+def test_spilled_outputs_are_not_compacted_again(monkeypatch):
+    monkeypatch.setattr(settings, "max_tokens", 500)
+    monkeypatch.setattr(settings, "keep_recent", 2)
+    monkeypatch.setattr(tool_output_settings, "max_chars", 2_000)
+    call = {"name": "fetch", "args": {"url": "u"}, "id": "call1", "type": "tool_call"}
+    spilled = spill_large_outputs(fetch).invoke(call).update["messages"][0]
+    other = fetch.invoke({**call, "id": "call2"})
+    update = _compact(_history(spilled, other))
+    assert [message.tool_call_id for message in update["messages"]] == ["call2"]
@@ -0,0 +1,37 @@
+import pytest
+
+from deepagents import disk_file
+from deepagents.disk_file import open_disk_file
+from deepagents.persist import _write_now
+
+TEXTS = [
+    "",
+    "  \n\t\n",
+    "one\ntwo\r\nthree\rfour",
+    "a\x0bb\x0cc\x1cd\x1de\x1ef\x85g h i\n",
+    "café\r\n€\r\n\r\n",
+]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+@pytest.mark.parametrize("block_size", [1, 2, 5, 1 << 20])
+def test_lines_match_splitlines(tmp_path, monkeypatch, text, block_size):
+    monkeypatch.setattr(disk_file, "_BLOCK_SIZE", block_size)
+    path = tmp_path / "f.txt"
+    path.write_bytes(text.encode("utf-8"))
+    f = open_disk_file(path)
+    expected = text.splitlines()
+    assert f.lines(0, 2) == expected[:2]
+    assert len(f) == len(expected)
+    assert f.lines(1, 100) == expected[1:]
+    assert f.blank == (not text or text.isspace())
+
+
+def test_rewritten_file_is_reindexed(tmp_path):
+    path = tmp_path / "report.md"
+    _write_now(path, "old\n" * 1000)
+    f = open_disk_file(path)
+    assert f.lines(0, 1) == ["old"]
+    _write_now(path, "new\n")
+    assert open_disk_file(path).lines(0, 10) == ["new"]
+    assert [p.name for p in tmp_path.iterdir()] == ["report.md"]
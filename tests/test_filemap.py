@@ -0,0 +1,69 @@
+import copy
+import pickle
+import random
+
+from deepagents.filemap import FileMap
+
+SEGMENTS = ["a", "b", "c", "a.b", "x y"]
+
+
+def _path(rng):
+    return "/".join(rng.choice(SEGMENTS) for _ in range(rng.randint(1, 3)))
+
+
+def _trie_order(paths):
+    return sorted(paths, key=lambda p: p.split("/"))
+
+
+def test_matches_a_dict_model():
+    rng = random.Random(1)
+    files, model = FileMap(), {}
+    files.path_index()
+    for i in range(2000):
+        op = rng.random()
+        path = _path(rng)
+        if op < 0.6:
+            files, model[path] = files.set(path, str(i)), str(i)
+        elif op < 0.8:
+            files = files.delete(path)
+            model.pop(path, None)
+        else:
+            other = files.set(_path(rng), "o").delete(_path(rng))
+            files = files.update(other)
+            model.update(other)
+        if i % 100 == 0:
+            assert dict(files) == model
+            assert len(files) == len(model)
+            assert list(files.path_index().iter_paths()) == _trie_order(model)
+    assert all(files[path] == value for path, value in model.items())
+    assert "missing" not in files and files.get("missing") is None
+
+
+def test_set_and_delete_leave_the_original_unchanged():
+    original = FileMap({"a.md": "a"})
+    changed = original.set("b.md", "b").delete("a.md")
+    assert dict(original) == {"a.md": "a"}
+    assert dict(changed) == {"b.md": "b"}
+
+
+def test_diff_lists_changed_and_deleted_paths():
+    old = FileMap({str(i): i for i in range(500)})
+    new = old.set("5", -1).delete("7").set("new", 1)
+    assert old.diff(new, deleted=None) == {"5": -1, "7": None, "new": 1}
+    assert old.diff(old) == {}
+
+
+def test_ls_order_and_cursor():
+    files = FileMap({"d/b.md": 1, "d/a.md": 2, "e.md": 3, "d/sub/c.md": 4})
+    index = files.path_index()
+    assert list(index.iter_paths()) == ["d/a.md", "d/b.md", "d/sub/c.md", "e.md"]
+    assert list(index.iter_paths("d", "d/b.md")) == ["d/sub/c.md"]
+
+
+def test_copies_and_pickles():
+    files = FileMap({"a.md": "a", "b/c.md": "c"})
+    assert copy.copy(files) is files
+    assert copy.deepcopy(files) is files
+    loaded = pickle.loads(pickle.dumps(files))
+    assert isinstance(loaded, FileMap) and dict(loaded) == dict(files)
+    assert loaded.snapshot_id != files.snapshot_id
@@ -0,0 +1,37 @@
+import pytest
+
+from deepagents import line_index
+from deepagents.line_index import LineIndex, cached_line_index, invalidate_line_index
+
+
+@pytest.mark.parametrize(
+    "text", ["", "a", "a\n", "a\r\nb\rc\n\nd", "x\x0by\x0cz\x1c\x1d\x1e\x85  end"]
+)
+def test_lines_match_splitlines(text):
+    index = LineIndex(text)
+    assert len(index) == len(text.splitlines())
+    assert index.lines(0, 100) == text.splitlines()
+
+
+def test_cache_is_bounded_by_characters(monkeypatch):
+    monkeypatch.setattr(line_index, "_MAX_CACHED_CHARS", 10)
+    loads = []
+
+    def load(value):
+        loads.append(value)
+        return value
+
+    for path in ("a", "b"):
+        invalidate_line_index(path)
+    a, b = "aaaa\naaaa", "bbbb\nbbbb"
+    cached_line_index("a", a, load)
+    cached_line_index("a", a, load)
+    assert loads == [a]
+    cached_line_index("b", b, load)
+    assert line_index._cached_chars <= 10
+    cached_line_index("a", a, load)
+    assert loads == [a, b, a]
+
+    big = "x" * 11
+    assert cached_line_index("big", big, load).lines(0, 1) == [big]
+    assert "big" not in line_index._cache
@@ -0,0 +1,67 @@
+from langchain_core.messages import HumanMessage
+
+from deepagents.cache import InMemoryCache
+from deepagents.llm_cache import CachedChatModel, cached_model
+from deepagents.model import settings
+from fakes import Rule, ai
+
+
+class _Counting(Rule):
+    temperature: float = 0
+    calls: int = 0
+
+    @property
+    def _identifying_params(self):
+        return {"temperature": self.temperature}
+
+
+def _model(temperature=0):
+    def fn(messages):
+        model.calls += 1
+        return ai(text=f"reply {model.calls}")
+
+    model = _Counting(fn=fn, temperature=temperature)
+    return model
+
+
+def test_repeated_request_is_answered_from_the_cache():
+    model = _model()
+    cached = CachedChatModel(model=model, response_cache=InMemoryCache())
+    first = cached.invoke([HumanMessage("hi")])
+    second = cached.invoke([HumanMessage("hi")])
+    assert model.calls == 1
+    assert second.content == first.content == "reply 1"
+    assert second.id != first.id
+    cached.invoke([HumanMessage("other")])
+    assert model.calls == 2
+
+
+def test_cache_is_keyed_on_the_model_parameters():
+    cache = InMemoryCache()
+    cold, warm = _model(0), _model(1)
+    CachedChatModel(model=cold, response_cache=cache).invoke([HumanMessage("hi")])
+    CachedChatModel(model=warm, response_cache=cache).invoke([HumanMessage("hi")])
+    assert (cold.calls, warm.calls) == (1, 1)
+    # An equal model hits the entry of the first
+    again = _model(0)
+    assert CachedChatModel(model=again, response_cache=cache).invoke([HumanMessage("hi")]).content == "reply 1"
+    assert again.calls == 0
+
+
+def test_sampled_calls_can_bypass_the_cache():
+    model = _model(1)
+    cached = CachedChatModel(model=model, response_cache=InMemoryCache(), cache_sampled=False)
+    cached.invoke([HumanMessage("hi")])
+    cached.invoke([HumanMessage("hi")])
+    assert model.calls == 2
+
+
+def test_cached_model_reuses_its_wrapper(monkeypatch):
+    model = _model()
+    assert cached_model(model) is model
+    monkeypatch.setattr(settings, "response_cache", InMemoryCache())
+    wrapper = cached_model(model)
+    assert isinstance(wrapper, CachedChatModel) and wrapper.model is model
+    assert cached_model(model) is wrapper
+    monkeypatch.setattr(settings, "response_cache", InMemoryCache())
+    assert cached_model(model) is not wrapper
@@ -0,0 +1,57 @@
+from deepagents.filemap import FileMap
+from deepagents.merge import FileMerge, merge_text, reconcile
+from deepagents.state import file_reducer
+
+
+def _apply(parent, update):
+    return dict(file_reducer(parent, update))
+
+
+def test_concurrent_appends_are_both_kept():
+    parent = FileMap({"notes.md": "head\n"})
+    first, _ = reconcile(parent, parent, {"notes.md": "head\none\n"})
+    second, conflicts = reconcile(parent, parent, {"notes.md": "head\ntwo\n"})
+    assert not conflicts
+    files = file_reducer(file_reducer(parent, first), second)
+    assert files["notes.md"] == "head\none\ntwo\n"
+
+
+def test_file_not_given_to_the_sub_agent_is_not_overwritten():
+    parent = FileMap({"report.md": "parent report", "notes/a.md": "a"})
+    base = FileMap({"notes/a.md": "a"})
+    update, conflicts = reconcile(parent, base, {"report.md": "sub agent report"})
+    assert [c["path"] for c in conflicts] == ["report.md"]
+    saved_as = conflicts[0]["saved_as"]
+    files = _apply(parent, update)
+    assert files["report.md"] == "parent report"
+    assert files[saved_as] == "sub agent report"
+
+
+def test_new_file_outside_the_handoff_is_added():
+    parent = FileMap({"notes/a.md": "a"})
+    update, conflicts = reconcile(parent, FileMap(), {"report.md": "new"})
+    assert not conflicts
+    assert isinstance(update["report.md"], FileMerge)
+    assert _apply(parent, update)["report.md"] == "new"
+
+
+def test_append_to_unfinished_line_is_a_conflict():
+    text, conflicts = merge_text("a\nb", "a\nb\nx", "a\nbc")
+    assert conflicts
+    assert text == "a\nb\nx"
+
+
+def test_entries_in_either_order_keep_the_newest_version():
+    parent = FileMap({"notes.md": "head\n"})
+    first, _ = reconcile(parent, parent, {"notes.md": "head\none\n"})
+    second, _ = reconcile(parent, parent, {"notes.md": "head\ntwo\n"})
+    files = file_reducer(file_reducer(parent, second), first)
+    assert files["notes.md"] == "head\none\ntwo\n"
+
+
+def test_entry_from_an_unknown_round_is_merged_three_way():
+    parent = FileMap({"notes.md": "head\n"})
+    entry = FileMerge("head\n", "head\nmine\n", "round-of-another-process", 1)
+    files = file_reducer(FileMap({"notes.md": "head\ntheirs\n"}), {"notes.md": entry})
+    assert files["notes.md"] == "head\ntheirs\nmine\n"
+    assert reconcile(parent, parent, {"notes.md": "x"})[0]["notes.md"].round == parent.snapshot_id
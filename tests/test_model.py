@@ -0,0 +1,19 @@
+import pytest
+
+from deepagents.model import get_default_model, settings
+
+
+def test_default_model_is_shared(monkeypatch):
+    monkeypatch.setenv("NVIDIA_API_KEY", "nvapi-test")
+    model = get_default_model()
+    assert get_default_model() is model
+    monkeypatch.setattr(settings, "pool_maxsize", settings.pool_maxsize + 1)
+    assert get_default_model() is not model
+
+
+def test_requests_share_one_connection_pool(monkeypatch):
+    monkeypatch.setenv("NVIDIA_API_KEY", "nvapi-test")
+    client = get_default_model()._client
+    if not hasattr(client, "get_session_fn"):
+        pytest.skip("this version of the integration manages its own sessions")
+    assert client.get_session_fn() is client.get_session_fn()
@@ -0,0 +1,49 @@
+import threading
+
+from deepagents.persist import WriteBehindPersister
+
+
+def test_last_write_to_a_path_wins(tmp_path):
+    persister = WriteBehindPersister(batch_delay=0.05)
+    path = tmp_path / "notes.md"
+    for i in range(20):
+        persister.write(path, f"version {i}")
+    assert persister.flush(timeout=5)
+    assert path.read_text() == "version 19"
+
+
+def test_appends_are_written_in_order(tmp_path):
+    persister = WriteBehindPersister()
+    path = tmp_path / "log.md"
+    persister.write(path, "start\n")
+    assert persister.flush(timeout=5)
+    content = "start\n"
+    for i in range(10):
+        content += f"{i}\n"
+        persister.append(path, f"{i}\n", content)
+    assert persister.flush(timeout=5)
+    assert path.read_text() == content
+
+
+def test_full_write_replaces_pending_appends(tmp_path):
+    persister = WriteBehindPersister(batch_delay=1)
+    path = tmp_path / "doc.md"
+    persister.append(path, "appended", "appended")
+    persister.write(path, "rewritten")
+    persister.append(path, "!", "rewritten!")
+    assert persister.flush(timeout=5)
+    assert path.read_text() == "rewritten!"
+
+
+def test_flush_waits_for_writes_queued_before_it(tmp_path):
+    persister = WriteBehindPersister(max_pending=2, batch_delay=0.01)
+    paths = [tmp_path / f"{i}.md" for i in range(10)]
+    writers = [
+        threading.Thread(target=persister.write, args=(path, path.name)) for path in paths
+    ]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    assert persister.flush(timeout=5)
+    assert all(path.read_text() == path.name for path in paths)
@@ -0,0 +1,49 @@
+import pickle
+import random
+
+from deepagents.chunked_text import ChunkedText
+from deepagents.piece_table import PieceTable
+
+
+def test_edits_match_a_str_model():
+    rng = random.Random(2)
+    text = "".join(rng.choice("ab \n") for _ in range(200))
+    table = PieceTable(text)
+    for _ in range(500):
+        start = rng.randrange(len(text) + 1)
+        end = min(len(text), start + rng.randint(0, 6))
+        new = "".join(rng.choice("xyz\n") for _ in range(rng.randint(0, 4)))
+        table = table.splice(start, end, new)
+        text = text[:start] + new + text[end:]
+        assert len(table) == len(text)
+        i, j = sorted(rng.randrange(len(text) + 1) for _ in range(2))
+        assert table.substring(i, j) == text[i:j]
+    assert str(table) == text
+    assert table.count("x") == text.count("x")
+    assert table.find("zz") == text.find("zz")
+
+
+def test_find_all_and_replace():
+    table = PieceTable("one two one").splice(4, 7, "one")
+    assert list(table.find_all("one")) == [0, 4, 8]
+    assert str(table.replace("one", "1")) == "1 1 1"
+    assert str(table.splice_many([(0, 3, "A"), (8, 11, "C")])) == "A one C"
+
+
+def test_text_types_pickle_as_flat_text():
+    table = PieceTable("abc").splice(1, 2, "X")
+    chunks = ChunkedText("a").append("b").append("c")
+    assert str(pickle.loads(pickle.dumps(table))) == "aXc"
+    assert str(pickle.loads(pickle.dumps(chunks))) == "abc"
+    assert table._asdict() == {"text": "aXc"}
+
+
+def test_chunked_text_appends():
+    rng = random.Random(3)
+    text, chunks = "", ChunkedText()
+    for _ in range(200):
+        piece = "".join(rng.choice("ab\n") for _ in range(rng.randint(0, 5)))
+        chunks, text = chunks.append(piece), text + piece
+        n = rng.randint(0, 10)
+        assert chunks.tail(n) == (text[-n:] if n else "")
+    assert str(chunks) == text and len(chunks) == len(text)
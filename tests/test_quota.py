@@ -0,0 +1,52 @@
+import pytest
+
+from deepagents import vfs
+from deepagents.blobs import BlobRef
+from deepagents.filemap import FileMap
+from deepagents.state import file_reducer
+from deepagents.tools import edit_file, read_file, write_file
+
+
+@pytest.fixture
+def quota(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(vfs.settings, "disk_write_behind", False)
+    monkeypatch.setattr(vfs.settings, "thread_quota_bytes", 10)
+
+
+def _call(tool, files, **args):
+    args["state"] = {"messages": [], "files": files}
+    return tool.invoke({"name": tool.name, "args": args, "id": "c", "type": "tool_call"})
+
+
+def test_write_over_quota_spills_the_coldest_file(quota):
+    files = FileMap({"a.md": "a" * 8})
+    command = _call(write_file, files, file_path="b.md", content="b" * 8)
+    files = file_reducer(files, command.update["files"])
+    assert isinstance(files["a.md"], BlobRef)
+    assert files["b.md"] == "b" * 8
+    assert "aaaaaaaa" in _call(read_file, files, file_path="a.md").update["messages"][0].content
+
+
+def test_read_pages_a_spilled_file_back_in(quota):
+    files = FileMap({"a.md": "a" * 8})
+    files = file_reducer(files, _call(write_file, files, file_path="b.md", content="b" * 8).update["files"])
+    files = file_reducer(files, _call(read_file, files, file_path="a.md").update["files"])
+    assert files["a.md"] == "a" * 8
+    assert isinstance(files["b.md"], BlobRef)
+    assert vfs.decode_content(files["b.md"]) == "b" * 8
+
+
+def test_page_in_does_not_undo_a_concurrent_edit(quota):
+    files = FileMap({"a.md": "head\nend"})
+    files = file_reducer(files, _call(write_file, files, file_path="b.md", content="b" * 8).update["files"])
+    read = _call(read_file, files, file_path="a.md").update["files"]
+    edit = _call(edit_file, files, file_path="a.md", old_string="end", new_string="tail").update["files"]
+    files = file_reducer(file_reducer(files, edit), read)
+    assert vfs.decode_content(files["a.md"]) == "head\ntail"
+
+
+def test_no_quota_reads_return_text(monkeypatch):
+    monkeypatch.setattr(vfs.settings, "thread_quota_bytes", None)
+    message = _call(read_file, FileMap({"a.md": "one\ntwo"}), file_path="a.md", offset=1)
+    assert message.content == "     2\ttwo"
@@ -0,0 +1,55 @@
+import re
+
+import pytest
+
+from deepagents.filemap import FileMap
+from deepagents.search_index import TrigramIndex, required_literals
+from deepagents.tools import grep
+
+
+def test_required_literals_of_plain_pattern():
+    assert required_literals(r"def search_index\(") == ["def search_index("]
+
+
+def test_required_literals_drop_quantified_characters():
+    assert required_literals("errors?found") == ["error", "found"]
+
+
+def test_search_syncs_with_the_files_given():
+    index = TrigramIndex()
+    first = {"a.txt": "needle", "b.txt": "hay"}
+    second = {"a.txt": "hay", "c.txt": "needle"}
+    assert index.search(first, str, ["needle"]) == {"a.txt"}
+    assert index.search(second, str, ["needle"]) == {"c.txt"}
+    assert index.search(first, str, ["needle"]) == {"a.txt"}
+    assert index.search(first, str, ["ne"]) is None
+
+
+@pytest.mark.parametrize(
+    "pattern, text",
+    [
+        (r"\x41BCDEF", "ABCDEF"),
+        (r"\101BCDEF", "ABCDEF"),
+        (r"\0BCDEF", "\0BCDEF"),
+        (r"\u0041BCDEF", "ABCDEF"),
+        (r"\U00000041BCDEF", "ABCDEF"),
+        (r"\N{LATIN CAPITAL LETTER A}BCDEF", "ABCDEF"),
+        (r"(abc)\1def", "abcabcdef"),
+        (r"(?x) abc \ def  # comment", "abc def"),
+        (r"(?ix) ABC  DEF", "abcdef"),
+        (r"(?x:ab c)d", "abcd"),
+    ],
+)
+def test_required_literals_are_in_every_match(pattern, text):
+    assert re.search(pattern, text)
+    for literal in required_literals(pattern):
+        assert literal.casefold() in text.casefold()
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [r"\x41BCDEF", r"\101BCDEF", r"\u0041BCDEF", r"\N{LATIN CAPITAL LETTER A}BCDEF", r"(?x) A B C D E F"],
+)
+def test_grep_finds_escaped_and_verbose_patterns(pattern):
+    state = {"messages": [], "files": FileMap({"a.txt": "ABCDEF", "b.txt": "other"})}
+    assert grep.invoke({"pattern": pattern, "state": state}) == "a.txt:1: ABCDEF"
@@ -0,0 +1,92 @@
+import warnings
+
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.graph import END, START, StateGraph
+
+from deepagents.blobs import BlobRef
+from deepagents.compression import CompressedText
+from deepagents.filemap import FileMap
+from deepagents.merge import FileMerge
+from deepagents.piece_table import PieceTable
+from deepagents.chunked_text import ChunkedText
+from deepagents.state import TOMBSTONE, DeepAgentState, apply_file_updates, file_reducer
+
+
+def _graph():
+    def write(state):
+        return {"files": {f"out/{len(state['messages'])}.md": "step"}}
+
+    builder = StateGraph(DeepAgentState)
+    builder.add_node("write", write)
+    builder.add_edge(START, "write")
+    builder.add_edge("write", END)
+    return builder.compile(checkpointer=InMemorySaver())
+
+
+def test_files_survive_checkpoints_and_are_stored_as_updates():
+    graph = _graph()
+    config = {"configurable": {"thread_id": "t"}}
+    big = FileMap({f"w/{i}.md": "x" * 100 for i in range(200)})
+    graph.invoke({"messages": [("user", "a")], "files": big}, config)
+    graph.invoke({"messages": [("user", "b")]}, config)
+
+    files = graph.get_state(config).values["files"]
+    assert isinstance(files, FileMap)
+    assert len(files) == 202
+    assert files["out/1.md"] == files["out/2.md"] == "step"
+    # The latest checkpoint does not hold the whole map again
+    saved = graph.checkpointer.get_tuple(config).checkpoint["channel_values"]
+    assert not isinstance(saved.get("files"), FileMap)
+
+
+def test_file_types_load_without_warnings():
+    serde = JsonPlusSerializer()
+    values = [
+        FileMap({"a.md": "a"}),
+        BlobRef("digest", 3),
+        CompressedText("zlib", b"x", 1),
+        PieceTable("text"),
+        ChunkedText("text"),
+        FileMerge("a", "b", "round", 1),
+    ]
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        for value in values:
+            loaded = serde.loads_typed(serde.dumps_typed(value))
+            assert type(loaded) is type(value)
+
+
+def test_reducer_applies_deltas_and_tombstones():
+    files = FileMap({"a.md": "a", "b.md": "b"})
+    updated = file_reducer(files, {"a.md": "A", "b.md": TOMBSTONE, "c.md": "c"})
+    assert dict(updated) == {"a.md": "A", "c.md": "c"}
+    assert dict(files) == {"a.md": "a", "b.md": "b"}
+    assert file_reducer(files, None) is files
+    assert dict(file_reducer({"a.md": "a"}, {"b.md": "b"})) == {"a.md": "a", "b.md": "b"}
+
+
+def test_reducer_merges_a_full_map():
+    files = FileMap({"a.md": "a", "b.md": "b"})
+    assert dict(file_reducer(files, FileMap({"b.md": "B", "c.md": "c"}))) == {
+        "a.md": "a",
+        "b.md": "B",
+        "c.md": "c",
+    }
+
+
+def test_reducer_merges_file_merge_entries():
+    files = FileMap({"notes.md": "head\nchanged\n"})
+    entry = FileMerge("head\n", "head\nadded\n", "unknown round", 1)
+    assert file_reducer(files, {"notes.md": entry})["notes.md"] == "head\nchanged\nadded\n"
+    deleted = FileMerge("head\nchanged\n", TOMBSTONE, "unknown round", 1)
+    assert "notes.md" not in file_reducer(files, {"notes.md": deleted})
+
+
+def test_batch_reducer_matches_one_update_at_a_time():
+    files = FileMap({"a.md": "a"})
+    updates = [{"b.md": "b"}, {"a.md": TOMBSTONE}, {"b.md": "B"}]
+    one_by_one = files
+    for update in updates:
+        one_by_one = file_reducer(one_by_one, update)
+    assert dict(apply_file_updates(files, updates)) == dict(one_by_one) == {"b.md": "B"}
@@ -0,0 +1,163 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.tools import tool
+
+from deepagents import create_deep_agent
+from deepagents.cache import InMemoryCache
+from deepagents.sub_agent import settings
+from deepagents.vfs import decode_content
+from fakes import Rule, ai, tool_results
+
+
+@pytest.fixture(autouse=True)
+def _in_tmp_path(tmp_path, monkeypatch):
+    # Written files are mirrored to disk under the CWD
+    monkeypatch.chdir(tmp_path)
+
+
+def _task_description(messages):
+    return [m.content for m in messages if m.type == "human"][-1]
+
+
+def _parent(*calls):
+    """Script of a parent that makes ``calls`` once, then finishes."""
+
+    def step(messages):
+        if messages[-1].type == "human":
+            return ai(*calls)
+        return ai(text="done")
+
+    return step
+
+
+def _agent(sub_step, *calls, tools=(), model=Rule, **spec):
+    def fn(messages):
+        if _task_description(messages) == "hi":
+            return _parent(*calls)(messages)
+        return sub_step(messages)
+
+    subagent = {"name": "w", "description": "worker", "prompt": "p", **spec}
+    return create_deep_agent(list(tools), "x", model=model(fn=fn), subagents=[subagent])
+
+
+def _task(description="go"):
+    return ("task", {"description": description, "subagent_type": "w"})
+
+
+def _looping(messages):
+    """A sub agent that never finishes on its own: it writes one file per model call."""
+    calls = sum(1 for m in messages if m.type == "ai") + 1
+    return ai(("write_file", {"file_path": f"out/{calls}.md", "content": "x"}), text=f"progress {calls}")
+
+
+@pytest.mark.parametrize(
+    ("budget", "stopped"),
+    [({"max_model_calls": 3}, "3 model calls"), ({"max_steps": 3}, "3 steps")],
+)
+def test_budget_stops_the_sub_agent_with_its_partial_result(budget, stopped):
+    result = _agent(_looping, _task(), **budget).invoke({"messages": [("user", "hi")]})
+    (content,) = tool_results(result["messages"])
+    assert content.startswith(f"Sub agent stopped early after reaching its budget of {stopped}")
+    assert "Partial result:" in content and "progress" in content
+    # Files the sub agent wrote before it was stopped are kept
+    assert "out/1.md" in result["files"]
+
+
+def test_deadline_stops_the_sub_agent():
+    @tool
+    def wait() -> str:
+        """Wait a bit."""
+        time.sleep(0.2)
+        return "waited"
+
+    agent = _agent(lambda messages: ai(("wait", {})), _task(), tools=[wait], deadline=0.5)
+    started = time.monotonic()
+    result = agent.invoke({"messages": [("user", "hi")]})
+    assert time.monotonic() - started < 5
+    assert "budget of 0.5 seconds" in tool_results(result["messages"])[0]
+
+
+def test_handoff_passes_and_merges_back_only_the_selected_files():
+    def sub(messages):
+        if messages[-1].type == "human":
+            return ai(
+                ("ls", {}),
+                ("write_file", {"file_path": "docs/new.md", "content": "new"}),
+                ("write_file", {"file_path": "scratch.txt", "content": "tmp"}),
+            )
+        # Report what ``ls`` showed
+        return ai(text=tool_results(messages)[0])
+
+    agent = _agent(sub, _task(), files=["docs/*"], output_files=["docs/*"])
+    files = {"docs/a.md": "a", "src/b.py": "b"}
+    result = agent.invoke({"messages": [("user", "hi")], "files": files})
+    listing = tool_results(result["messages"])[0]
+    assert "docs/a.md" in listing and "src/b.py" not in listing
+    assert sorted(result["files"]) == ["docs/a.md", "docs/new.md", "src/b.py"]
+
+
+def test_task_batch_runs_sub_agents_concurrently():
+    @tool
+    async def wait() -> str:
+        """Wait a bit."""
+        await asyncio.sleep(0.3)
+        return "waited"
+
+    def sub(messages):
+        if messages[-1].type == "human":
+            return ai(("wait", {}))
+        return ai(text="result " + _task_description(messages))
+
+    items = [{"description": f"d{i}", "subagent_type": "w"} for i in range(4)]
+    agent = _agent(sub, ("task_batch", {"tasks": items}), tools=[wait])
+    started = time.monotonic()
+    result = asyncio.run(agent.ainvoke({"messages": [("user", "hi")]}))
+    assert time.monotonic() - started < 1.2
+    (content,) = tool_results(result["messages"])
+    for i in range(4):
+        assert f"result d{i}" in content
+
+
+def test_sub_agent_progress_is_streamed_as_custom_events():
+    def sub(messages):
+        if messages[-1].type == "human":
+            return ai(("ls", {}))
+        return ai(text="finished")
+
+    agent = _agent(sub, _task())
+    events = [event for _, event in agent.stream({"messages": [("user", "hi")]}, stream_mode=["custom"])]
+    assert [event["event"] for event in events] == ["start", "model", "tool_result", "model", "end"]
+    assert all(event["namespace"] == "w:c0_task" for event in events)
+    assert events[-1]["complete"] is True
+
+
+class _Tuned(Rule):
+    temperature: float = 0
+
+    @property
+    def _identifying_params(self):
+        return {"temperature": self.temperature}
+
+
+def test_result_cache_is_keyed_on_the_model(monkeypatch):
+    monkeypatch.setattr(settings, "result_cache", InMemoryCache())
+
+    def run(tag, temperature):
+        def sub(messages):
+            if messages[-1].type == "human":
+                return ai(("write_file", {"file_path": "out.md", "content": tag}))
+            return ai(text=f"answer from {tag}")
+
+        def model(fn):
+            return _Tuned(fn=fn, temperature=temperature)
+
+        result = _agent(sub, _task(), model=model).invoke({"messages": [("user", "hi")]})
+        return tool_results(result["messages"])[0], decode_content(result["files"]["out.md"])
+
+    assert run("A", 0) == ("answer from A", "A")
+    # Another model misses the cache
+    assert run("B", 1) == ("answer from B", "B")
+    # The same model hits it: the cached result and files are returned
+    assert run("C", 1) == ("answer from B", "B")
@@ -0,0 +1,57 @@
+import json
+
+from langchain_core.tools import tool
+
+from deepagents.filemap import FileMap
+from deepagents.tool_output import configure_tool_outputs, settings, spill_large_outputs
+from deepagents.tools import read_file
+
+
+@tool
+def fetch(url: str) -> str:
+    """Fetch a page."""
+    page = " ".join(f"word{i}" for i in range(12_000))
+    return json.dumps({"url": url, "content": page})
+
+
+def _read_all(files, path, limit=50):
+    lines = []
+    offset = 0
+    while True:
+        args = {"file_path": path, "state": {"messages": [], "files": files}, "offset": offset, "limit": limit}
+        result = read_file.invoke({"name": "read_file", "args": args, "id": "r", "type": "tool_call"}).content
+        if result.startswith("Error: Line offset"):
+            return lines
+        page = [line.split("\t", 1)[1] for line in result.split("\n")]
+        lines.extend(page)
+        offset += len(page)
+
+
+def test_spilled_output_is_fully_readable(monkeypatch):
+    monkeypatch.setattr(settings, "max_chars", 10_000)
+    call = {"name": "fetch", "args": {"url": "u"}, "id": "call1", "type": "tool_call"}
+    command = spill_large_outputs(fetch).invoke(call)
+    (path, _), = command.update["files"].items()
+    assert path == "tool_outputs/full/fetch-call1.txt"
+    assert "use read_file or grep" in command.update["messages"][0].content
+
+    lines = _read_all(FileMap(command.update["files"]), path)
+    assert max(len(line) for line in lines) <= 2000
+    page = json.loads(fetch.invoke({"url": "u"}))["content"]
+    assert page in "".join(lines)
+
+
+def test_short_output_is_left_alone(monkeypatch):
+    monkeypatch.setattr(settings, "max_chars", 10_000_000)
+    call = {"name": "fetch", "args": {"url": "u"}, "id": "call1", "type": "tool_call"}
+    message = spill_large_outputs(fetch).invoke(call)
+    assert json.loads(message.content)["url"] == "u"
+
+
+def test_configure_rejects_unknown_settings():
+    try:
+        configure_tool_outputs(max_chars_typo=1)
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("expected TypeError")
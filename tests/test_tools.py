@@ -0,0 +1,92 @@
+import pytest
+
+from deepagents.chunked_text import ChunkedText
+from deepagents.filemap import FileMap
+from deepagents.persist import flush_disk_writes
+from deepagents.piece_table import PieceTable
+from deepagents.tools import append_file, edit_file, ls, multi_edit
+from deepagents.vfs import decode_content, settings
+
+
+@pytest.fixture(autouse=True)
+def _in_tmp_path(tmp_path, monkeypatch):
+    # Written files are mirrored to disk under the CWD
+    monkeypatch.chdir(tmp_path)
+
+
+def _ls(files, **kwargs):
+    return ls.invoke({"state": {"messages": [], "files": FileMap(files)}, **kwargs})
+
+
+def test_ls_lists_files():
+    assert _ls({"a.md": "a", "b.md": "b"}) == ["a.md", "b.md"]
+
+
+def test_ls_pages_with_cursor():
+    files = {f"{name}.md": name for name in "abc"}
+    first = _ls(files, limit=2)
+    assert first[:2] == ["a.md", "b.md"]
+    assert "cursor='b.md'" in first[2]
+    assert _ls(files, limit=2, cursor="b.md") == ["c.md"]
+
+
+def test_ls_rejects_limit_below_one():
+    for limit in (0, -1):
+        result = _ls({"a.md": "a"}, limit=limit)
+        assert isinstance(result, str) and result.startswith("Error:")
+
+
+def _call(tool, files, **args):
+    args["state"] = {"messages": [], "files": FileMap(files)}
+    return tool.invoke({"name": tool.name, "args": args, "id": "call1", "type": "tool_call"})
+
+
+def test_multi_edit_applies_all_edits_against_the_original():
+    edits = [
+        {"old_string": "a", "new_string": "b"},
+        {"old_string": "b", "new_string": "c"},
+        {"old_string": "x", "new_string": "", "replace_all": True},
+    ]
+    command = _call(multi_edit, {"f.md": "a b x x"}, file_path="f.md", edits=edits)
+    assert decode_content(command.update["files"]["f.md"]) == "b c  "
+    assert "(4 replacement(s))" in command.update["messages"][0].content
+
+
+def test_multi_edit_rejects_bad_edits_without_changing_anything():
+    files = {"f.md": "one two one"}
+    cases = [
+        ([{"old_string": "one", "new_string": "1"}], "appears 2 times"),
+        ([{"old_string": "three", "new_string": "3"}], "not found"),
+        ([{"old_string": "one two", "new_string": ""}, {"old_string": "two", "new_string": ""}], "overlap"),
+        ([{"old_string": "", "new_string": "x"}], "must not be empty"),
+    ]
+    for edits, error in cases:
+        message = _call(multi_edit, files, file_path="f.md", edits=edits)
+        assert message.content.startswith("Error:") and error in message.content
+
+
+def test_edit_file_keeps_large_files_as_piece_tables(monkeypatch):
+    monkeypatch.setattr(settings, "piece_table_min_size", 10)
+    text = "line\n" * 20
+    command = _call(edit_file, {"f.md": text}, file_path="f.md", old_string="line", new_string="row", replace_all=True)
+    stored = command.update["files"]["f.md"]
+    assert isinstance(stored, PieceTable)
+    assert str(stored) == text.replace("line", "row")
+
+
+def test_append_file_builds_chunks_and_mirrors_to_disk(tmp_path):
+    command = _call(append_file, {}, file_path="log.md", content="one\n")
+    files = dict(command.update["files"])
+    for line in ("two\n", "three\n"):
+        command = _call(append_file, files, file_path="log.md", content=line)
+        files.update(command.update["files"])
+    assert isinstance(files["log.md"], ChunkedText)
+    assert str(files["log.md"]) == "one\ntwo\nthree\n"
+    assert flush_disk_writes(timeout=10)
+    assert (tmp_path / "log.md").read_text() == "one\ntwo\nthree\n"
+
+
+def test_append_file_after_a_rewrite_mirrors_the_whole_file(tmp_path):
+    _call(append_file, {"log.md": "old\n"}, file_path="log.md", content="new\n")
+    assert flush_disk_writes(timeout=10)
+    assert (tmp_path / "log.md").read_text() == "old\nnew\n"
@@ -0,0 +1,63 @@
+import pytest
+
+from deepagents import vfs
+from deepagents.blobs import BlobRef, InMemoryBlobStore, LocalBlobStore, SQLiteBlobStore
+from deepagents.compression import CompressedText, compress_text, decompress_text
+from deepagents.piece_table import PieceTable
+
+
+@pytest.fixture(params=["memory", "local", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryBlobStore()
+    if request.param == "local":
+        return LocalBlobStore(tmp_path / "blobs")
+    return SQLiteBlobStore(tmp_path / "blobs.db")
+
+
+def test_blob_store_round_trip_and_dedup(store):
+    text = "héllo \ud800 world"
+    ref = store.put(text)
+    assert ref == store.put(text)
+    assert ref.size == len(text)
+    assert ref.digest in store
+    assert store.get(ref) == text
+    with pytest.raises(KeyError):
+        store.get("0" * 64)
+
+
+@pytest.mark.parametrize("codec", ["zlib", "lzma"])
+def test_compression_round_trip(codec):
+    text = "repeated line\n" * 500
+    value = compress_text(text, codec)
+    assert isinstance(value, CompressedText) and len(value.data) < len(text)
+    assert decompress_text(value) == text
+    # Not worth compressing: kept as is
+    assert compress_text("ab", codec) == "ab"
+
+
+def test_encode_content_follows_the_settings(monkeypatch):
+    store = InMemoryBlobStore()
+    text = "x" * 100
+    assert vfs.encode_content(text) is text
+
+    monkeypatch.setattr(vfs.settings, "compress_min_size", 50)
+    assert isinstance(vfs.encode_content(text), CompressedText)
+    assert vfs.encode_content("short") == "short"
+
+    monkeypatch.setattr(vfs.settings, "blob_store", store)
+    monkeypatch.setattr(vfs.settings, "blob_min_size", 10)
+    ref = vfs.encode_content(text)
+    assert isinstance(ref, BlobRef)
+    assert vfs.decode_content(ref) == text
+
+    table = PieceTable(text)
+    assert vfs.encode_content(table) is table
+    assert vfs.decode_content(table) == text
+
+
+def test_same_value():
+    text = "abc"
+    assert vfs.same_value(text, text)
+    assert vfs.same_value(BlobRef("d", 1), BlobRef("d", 1))
+    assert not vfs.same_value(BlobRef("d", 1), BlobRef("e", 1))